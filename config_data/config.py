@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-from environs import Env
+from environs import Env, validate
 
 BASE_DIR = Path(__file__).parent.parent
 
@@ -15,9 +15,26 @@ class TgBot:
     admin_ids: list[int]  # Список id администраторов бота
 
 
+@dataclass
+class Database:
+    url: str  # Адрес базы данных в формате SQLAlchemy
+    sqlite_profile: str  # Профиль настроек SQLite: default или performance
+    fsm_storage: str  # Хранилище состояний FSM: memory или sqlite
+    fsm_url: str  # Адрес отдельной базы SQLite для состояний FSM
+
+
+@dataclass
+class Tts:
+    concurrency: int  # Число одновременных запросов к gTTS
+    rate: float  # Общий лимит запросов к gTTS в секунду
+    burst: int  # Сколько запросов можно сделать подряд без ожидания
+
+
 @dataclass
 class Config:
     tg_bot: TgBot
+    db: Database
+    tts: Tts
     log_level: str
     language: str
     proxy_url: Optional[str] = None
@@ -33,6 +50,40 @@ def load_config(path: str | None = None) -> Config:
             token=env("BOT_TOKEN"),
             admin_ids=list(map(int, env.list("ADMIN_IDS"))),
         ),
+        db=Database(
+            url=env(
+                "DATABASE_URL",
+                default="sqlite+aiosqlite:///database/books.db",
+            ),
+            sqlite_profile=env("SQLITE_PROFILE", default="default").lower(),
+            fsm_storage=env("FSM_STORAGE", default="memory").lower(),
+            fsm_url=env(
+                "FSM_DATABASE_URL",
+                default="sqlite+aiosqlite:///database/fsm.db",
+            ),
+        ),
+        tts=Tts(
+            concurrency=env.int("TTS_CONCURRENCY", default=4),
+            # Нулевая скорость или пустое ведро токенов остановят озвучивание,
+            # поэтому такие значения отклоняются при запуске
+            rate=env.float(
+                "TTS_RATE",
+                default=2.0,
+                validate=validate.Range(
+                    min=0,
+                    min_inclusive=False,
+                    error="TTS_RATE must be greater than 0",
+                ),
+            ),
+            burst=env.int(
+                "TTS_BURST",
+                default=4,
+                validate=validate.Range(
+                    min=1,
+                    error="TTS_BURST must be at least 1",
+                ),
+            ),
+        ),
         log_level=env("LOG_LEVEL", "INFO").upper(),
         language=env("BOT_LANGUAGE", default="en"),
         proxy_url=env("PROXY_URL", default=None),
@@ -0,0 +1,129 @@
+"""
+Пересчет нормализованных полей книг и поисковых индексов
+(books_fts и book_trigrams).
+
+Запуск из корня проекта: python -m database.backfill
+"""
+
+__all__ = ()
+
+import asyncio
+
+from sqlalchemy import bindparam, delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from database.models import Book, book_trigrams, books_fts
+from database.normalization import book_trigram_rows, normalize_text
+
+BACKFILL_BATCH_SIZE = 500
+
+
+async def backfill_normalized_fields(
+    conn: AsyncConnection,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+):
+    """
+    Заполняет нормализованные поля всех книг и перестраивает по ним
+    поисковый индекс books_fts. Книги обрабатываются пачками по book_id.
+    """
+    stmt = (
+        update(Book)
+        .where(Book.book_id == bindparam("b_book_id"))
+        .values(
+            title_normalized=bindparam("b_title"),
+            author_normalized=bindparam("b_author"),
+            description_normalized=bindparam("b_description"),
+        )
+    )
+    await conn.execute(text("DELETE FROM books_fts"))
+
+    select_stmt = select(
+        Book.book_id,
+        Book.title,
+        Book.author,
+        Book.description,
+    ).order_by(Book.book_id)
+
+    last_book_id = 0
+    while True:
+        books = await conn.execute(
+            select_stmt.where(Book.book_id > last_book_id).limit(batch_size),
+        )
+        rows = [
+            {
+                "b_book_id": book_id,
+                "b_title": normalize_text(title),
+                "b_author": normalize_text(author),
+                "b_description": normalize_text(description),
+            }
+            for book_id, title, author, description in books
+        ]
+        if not rows:
+            break
+
+        await conn.execute(stmt, rows)
+        await conn.execute(
+            insert(books_fts),
+            [
+                {
+                    "rowid": row["b_book_id"],
+                    "title": row["b_title"],
+                    "author": row["b_author"],
+                    "description": row["b_description"],
+                }
+                for row in rows
+            ],
+        )
+        last_book_id = rows[-1]["b_book_id"]
+
+
+async def backfill_book_trigrams(
+    conn: AsyncConnection,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+):
+    """
+    Перестраивает таблицу триграмм book_trigrams по нормализованным
+    названиям и авторам книг.
+    """
+    await conn.execute(delete(book_trigrams))
+
+    select_stmt = select(
+        Book.book_id,
+        Book.title_normalized,
+        Book.author_normalized,
+    ).order_by(Book.book_id)
+
+    last_book_id = 0
+    while True:
+        result = await conn.execute(
+            select_stmt.where(Book.book_id > last_book_id).limit(batch_size),
+        )
+        books = result.all()
+        if not books:
+            break
+
+        rows = [
+            row
+            for book_id, title, author in books
+            for row in book_trigram_rows(book_id, title, author)
+        ]
+        if rows:
+            await conn.execute(insert(book_trigrams), rows)
+
+        last_book_id = books[-1].book_id
+
+
+async def main():
+    from config_data.config import config
+    from database import db_session
+
+    await db_session.global_init(config.db.url, config.db.sqlite_profile)
+    async with await db_session.create_session() as session:
+        conn = await session.connection()
+        await backfill_normalized_fields(conn)
+        await backfill_book_trigrams(conn)
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,11 @@
 __all__ = ()
 
+from functools import partial
 import importlib
 import logging
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
@@ -12,28 +15,60 @@ SqlAlchemyBase = declarative_base(cls=AsyncAttrs)
 __async_factory = None
 logger = logging.getLogger()
 
+# Наборы PRAGMA, применяемые к каждому новому соединению SQLite
+SQLITE_PROFILES = {
+    "default": {},
+    # WAL позволяет читателям не блокироваться единственным писателем
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": 5000,
+        "cache_size": -64000,  # 64 МБ
+        "mmap_size": 268435456,  # 256 МБ
+        "temp_store": "MEMORY",
+    },
+}
 
-async def global_init(db_file: str):
+
+def set_sqlite_pragmas(pragmas: dict, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+    cursor.close()
+
+
+async def global_init(db_url: str, sqlite_profile: str = "default"):
     global __async_factory
 
     if __async_factory:
         return
 
-    if not db_file or not db_file.strip():
-        raise Exception("Specify database file.")
+    if not db_url or not db_url.strip():
+        raise Exception("Specify database url.")
+
+    if sqlite_profile not in SQLITE_PROFILES:
+        raise Exception(f"Unknown SQLite profile: {sqlite_profile}")
 
-    # Для SQLite используем aiosqlite
-    conn_str = f"sqlite+aiosqlite:///{db_file.strip()}"
+    conn_str = db_url.strip()
     logger.info(
         f"Connecting to the database at the following address: {conn_str}",
     )
 
+    is_sqlite = make_url(conn_str).get_backend_name() == "sqlite"
     engine = create_async_engine(
         conn_str,
         echo=False,
         future=True,
-        connect_args={"check_same_thread": False},
+        connect_args={"check_same_thread": False} if is_sqlite else {},
     )
+    if is_sqlite:
+        event.listen(
+            engine.sync_engine,
+            "connect",
+            partial(set_sqlite_pragmas, SQLITE_PROFILES[sqlite_profile]),
+        )
 
     __async_factory = sessionmaker(
         bind=engine,
@@ -44,12 +79,52 @@ async def global_init(db_file: str):
 
     async with engine.begin() as conn:
         importlib.import_module("database.models")
+        migrations = importlib.import_module("database.migrations")
 
         await conn.run_sync(SqlAlchemyBase.metadata.create_all)
+        # Обновляем схему существующей базы данных
+        await migrations.run_migrations(conn)
 
 
-async def create_session() -> AsyncSession:
+def _new_session() -> AsyncSession:
     if __async_factory is None:
         raise RuntimeError("Databese not initialized. Call global_init()")
 
     return __async_factory()
+
+
+async def create_session() -> AsyncSession:
+    return _new_session()
+
+
+class LazySession:
+    """
+    Ленивая обертка над AsyncSession: сессия создается только при первом
+    обращении к ней, а commit/rollback/close неиспользованной сессии
+    ничего не делают
+    """
+
+    def __init__(self):
+        self._session: AsyncSession | None = None
+
+    @property
+    def is_used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str):
+        if self._session is None:
+            self._session = _new_session()
+
+        return getattr(self._session, name)
+
+    async def commit(self):
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self):
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,180 @@
+__all__ = ()
+
+from datetime import datetime, timezone
+from functools import partial
+import pickle
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import (
+    Column,
+    DateTime,
+    delete,
+    event,
+    LargeBinary,
+    MetaData,
+    select,
+    String,
+    Table,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.db_session import set_sqlite_pragmas, SQLITE_PROFILES
+from services.cache import LRUCache
+
+# Число состояний активных чатов, хранимых в памяти
+FSM_CACHE_SIZE = 10_000
+# Время в секундах, после которого неактивное состояние вытесняется из памяти
+FSM_CACHE_TTL = 30 * 60
+
+# Состояния FSM лежат в отдельном файле базы: запись состояния не ждет
+# транзакцию апдейта в основной базе и не блокирует её
+fsm_metadata = MetaData()
+
+# Ключ чата, имя состояния и сериализованные данные
+fsm_states = Table(
+    "fsm_states",
+    fsm_metadata,
+    Column("key", String(255), primary_key=True),
+    Column("state", String(255)),
+    Column("data", LargeBinary),
+    Column("updated_at", DateTime),
+)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище FSM в таблице fsm_states отдельной базы SQLite. Состояние
+    и данные сериализуются pickle в одну бинарную запись. Состояния
+    активных чатов хранятся в памяти (LRU с TTL от последнего обращения),
+    каждое изменение сначала записывается в базу, затем в память.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        sqlite_profile: str = "default",
+        key_builder: Optional[KeyBuilder] = None,
+        cache_size: int = FSM_CACHE_SIZE,
+        cache_ttl: float = FSM_CACHE_TTL,
+    ):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        # key -> (state, data)
+        self._cache = LRUCache(cache_size, ttl=cache_ttl)
+        self._engine = create_async_engine(
+            db_url,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(
+            self._engine.sync_engine,
+            "connect",
+            partial(set_sqlite_pragmas, SQLITE_PROFILES[sqlite_profile]),
+        )
+        self._session_factory = sessionmaker(
+            bind=self._engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+
+    async def init(self):
+        """Создает таблицу состояний, если её еще нет"""
+        async with self._engine.begin() as conn:
+            await conn.run_sync(fsm_metadata.create_all)
+
+    async def close(self):
+        self._cache.clear()
+        await self._engine.dispose()
+
+    async def set_state(self, key: StorageKey, state: StateType = None):
+        state = state.state if isinstance(state, State) else state
+        _, data = await self._get_record(key)
+        await self._set_record(key, state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]):
+        state, _ = await self._get_record(key)
+        await self._set_record(key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._get_record(key)
+        return data.copy()
+
+    async def set_state_and_data(
+        self,
+        key: StorageKey,
+        state: StateType,
+        data: Dict[str, Any],
+    ):
+        """Записывает состояние и данные одним запросом"""
+        state = state.state if isinstance(state, State) else state
+        await self._set_record(key, state, data.copy())
+
+    async def _get_record(self, key: StorageKey) -> tuple:
+        storage_key = self.key_builder.build(key)
+        record = self._cache.get(storage_key)
+        if record is not None:
+            # Время жизни отсчитывается от последнего обращения к состоянию
+            self._cache.set(storage_key, record)
+            return record
+
+        # Промах - заодно вытесняем из памяти состояния неактивных чатов
+        self._cache.expire()
+        session = self._session_factory()
+        try:
+            stmt = select(fsm_states.c.state, fsm_states.c.data).where(
+                fsm_states.c.key == storage_key,
+            )
+            row = (await session.execute(stmt)).first()
+        finally:
+            await session.close()
+
+        if row:
+            record = (row.state, pickle.loads(row.data) if row.data else {})
+        else:
+            record = (None, {})
+
+        self._cache.set(storage_key, record)
+        return record
+
+    async def _set_record(self, key: StorageKey, state, data: dict):
+        storage_key = self.key_builder.build(key)
+        session = self._session_factory()
+        try:
+            if state is None and not data:
+                # Пустые записи не храним
+                await session.execute(
+                    delete(fsm_states).where(fsm_states.c.key == storage_key),
+                )
+            else:
+                values = {
+                    "state": state,
+                    "data": pickle.dumps(data, pickle.HIGHEST_PROTOCOL),
+                    "updated_at": datetime.now(timezone.utc),
+                }
+                await session.execute(
+                    sqlite_insert(fsm_states)
+                    .values(key=storage_key, **values)
+                    .on_conflict_do_update(
+                        index_elements=[fsm_states.c.key],
+                        set_=values,
+                    ),
+                )
+
+            await session.commit()
+        finally:
+            await session.close()
+
+        # В память попадает только состояние, записанное в базу
+        self._cache.set(storage_key, (state, data))
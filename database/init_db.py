@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Genre
 from lexicon import DEFAULT_GENRES
+from services.genre_cache import load_genre_catalog
 
 
 async def init_genres(session: AsyncSession, force: bool = False):
@@ -15,6 +16,7 @@ async def init_genres(session: AsyncSession, force: bool = False):
         )
 
         if existing_count > 0:
+            await load_genre_catalog(session)
             return
 
     for genre_name in DEFAULT_GENRES:
@@ -22,3 +24,5 @@ async def init_genres(session: AsyncSession, force: bool = False):
         session.add(genre)
 
     await session.commit()
+    # Обновляем каталог жанров после изменения списка
+    await load_genre_catalog(session)
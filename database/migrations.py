@@ -0,0 +1,268 @@
+__all__ = ()
+
+import logging
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from database.backfill import (
+    backfill_book_trigrams,
+    backfill_normalized_fields,
+)
+from database.models import (
+    Audiobook,
+    Book,
+    book_genre,
+    Bookmark,
+    books_fts,
+    Page,
+    Review,
+)
+from database.normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+async def _add_column(conn: AsyncConnection, table: str, column_ddl: str):
+    """Добавляет столбец в таблицу, если его там ещё нет"""
+    column_name = column_ddl.split()[0]
+    columns = await conn.execute(text(f"PRAGMA table_info({table})"))
+    if column_name in {column.name for column in columns}:
+        return
+
+    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_ddl}"))
+
+
+# Миграция 1: поисковый индекс FTS5 по книгам
+async def _create_books_fts(conn: AsyncConnection):
+    # Триграммный токенизатор сохраняет семантику поиска по подстроке
+    await conn.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts "
+            "USING fts5(title, author, description, tokenize = 'trigram')",
+        ),
+    )
+    await conn.execute(text("DELETE FROM books_fts"))
+
+    books = await conn.execute(
+        select(Book.book_id, Book.title, Book.author, Book.description),
+    )
+    rows = [
+        {
+            "rowid": book_id,
+            "title": normalize_text(title),
+            "author": normalize_text(author),
+            "description": normalize_text(description),
+        }
+        for book_id, title, author, description in books
+    ]
+    if rows:
+        await conn.execute(insert(books_fts), rows)
+
+
+# Миграция 2: составные индексы и ограничения уникальности
+async def _create_indexes(conn: AsyncConnection):
+    # Перед созданием уникальных индексов удаляем накопившиеся дубликаты
+    await conn.execute(
+        text(
+            "DELETE FROM pages WHERE page_id NOT IN "
+            "(SELECT MIN(page_id) FROM pages GROUP BY book_id, num)",
+        ),
+    )
+    await conn.execute(
+        text(
+            "DELETE FROM bookmarks WHERE bookmark_id NOT IN "
+            "(SELECT MIN(bookmark_id) FROM bookmarks "
+            "GROUP BY user_id, book_id, page_number)",
+        ),
+    )
+    # Из отзывов пользователя на книгу оставляем самый новый
+    await conn.execute(
+        text(
+            "DELETE FROM reviews WHERE review_id NOT IN "
+            "(SELECT MAX(review_id) FROM reviews GROUP BY user_id, book_id)",
+        ),
+    )
+    await conn.execute(
+        text(
+            "DELETE FROM book_genre WHERE rowid NOT IN "
+            "(SELECT MIN(rowid) FROM book_genre GROUP BY book_id, genre_id)",
+        ),
+    )
+
+    for table in (
+        Page.__table__,
+        Bookmark.__table__,
+        Review.__table__,
+        Audiobook.__table__,
+        book_genre,
+    ):
+        for index in table.indexes:
+            await conn.run_sync(index.create, checkfirst=True)
+
+
+# Миграция 3: file_id обложек и аудиофайлов в Telegram
+async def _add_telegram_file_ids(conn: AsyncConnection):
+    await _add_column(conn, "books", "cover_file_id VARCHAR(255)")
+    await _add_column(conn, "audiobooks", "telegram_file_id VARCHAR(255)")
+
+
+# Пересчет агрегатов оценок книг по отзывам (миграции 4 и 10)
+_RECOUNT_RATING_AGGREGATES = text(
+    "UPDATE books SET "
+    "rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews "
+    "WHERE reviews.book_id = books.book_id), "
+    "rating_count = (SELECT COUNT(*) FROM reviews "
+    "WHERE reviews.book_id = books.book_id)",
+)
+
+
+# Миграция 4: агрегаты оценок книг и их заполнение по существующим отзывам
+async def _add_book_rating_aggregates(conn: AsyncConnection):
+    await _add_column(
+        conn,
+        "books",
+        "rating_sum NUMERIC(10, 1) NOT NULL DEFAULT 0",
+    )
+    await _add_column(conn, "books", "rating_count INTEGER NOT NULL DEFAULT 0")
+    await conn.execute(_RECOUNT_RATING_AGGREGATES)
+
+
+# Миграция 5: индексы для условия видимости книг
+async def _create_books_visibility_indexes(conn: AsyncConnection):
+    for index in Book.__table__.indexes:
+        if index.name in (
+            "ix_books_is_public_uploader_id",
+            "ix_books_uploader_id",
+        ):
+            await conn.run_sync(index.create, checkfirst=True)
+
+
+# Миграция 6: нормализованные поля книг для поиска
+async def _add_book_normalized_fields(conn: AsyncConnection):
+    await _add_column(conn, "books", "title_normalized VARCHAR(255)")
+    await _add_column(conn, "books", "author_normalized VARCHAR(255)")
+    await _add_column(conn, "books", "description_normalized TEXT")
+    await backfill_normalized_fields(conn)
+
+
+# Миграция 7: триграммы названий и авторов для нечеткого поиска.
+# Саму таблицу создает metadata.create_all, здесь она только заполняется
+async def _fill_book_trigrams(conn: AsyncConnection):
+    await backfill_book_trigrams(conn)
+
+
+def _fold_yo(expression: str) -> str:
+    """SQL-выражение, заменяющее в тексте ё на е"""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+# Миграция 8: полнотекстовый индекс по тексту страниц
+async def _create_pages_fts(conn: AsyncConnection):
+    # Индекс с внешним содержимым не дублирует текст страниц, а триггеры
+    # поддерживают его при любой вставке и удалении страниц.
+    # Токенизатор unicode61 не приводит "ё" к "е", поэтому текст
+    # нормализуется при индексации так же, как поисковый запрос
+    await conn.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+            "text, content = 'pages', content_rowid = 'page_id', "
+            "tokenize = 'unicode61 remove_diacritics 2')",
+        ),
+    )
+    await conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS pages_fts_ai AFTER INSERT ON pages "
+            "BEGIN "
+            "INSERT INTO pages_fts(rowid, text) "
+            f"VALUES (new.page_id, {_fold_yo('new.text')}); "
+            "END",
+        ),
+    )
+    await conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS pages_fts_ad AFTER DELETE ON pages "
+            "BEGIN "
+            "INSERT INTO pages_fts(pages_fts, rowid, text) "
+            f"VALUES ('delete', old.page_id, {_fold_yo('old.text')}); "
+            "END",
+        ),
+    )
+    await conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS pages_fts_au AFTER UPDATE ON pages "
+            "BEGIN "
+            "INSERT INTO pages_fts(pages_fts, rowid, text) "
+            f"VALUES ('delete', old.page_id, {_fold_yo('old.text')}); "
+            "INSERT INTO pages_fts(rowid, text) "
+            f"VALUES (new.page_id, {_fold_yo('new.text')}); "
+            "END",
+        ),
+    )
+    await conn.execute(
+        text("INSERT INTO pages_fts(pages_fts) VALUES ('delete-all')"),
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO pages_fts(rowid, text) "
+            f"SELECT page_id, {_fold_yo('text')} FROM pages",
+        ),
+    )
+
+
+# Миграция 9: состояния FSM хранятся в отдельном файле базы,
+# см. database.fsm_storage
+async def _drop_fsm_states(conn: AsyncConnection):
+    await conn.execute(text("DROP TABLE IF EXISTS fsm_states"))
+
+
+# Миграция 10: оценки отзывов с одним знаком после запятой, как в
+# Numeric(2, 1), чтобы агрегаты книги совпадали с суммой отзывов
+async def _round_review_ratings(conn: AsyncConnection):
+    await conn.execute(text("UPDATE reviews SET rating = ROUND(rating, 1)"))
+    await conn.execute(_RECOUNT_RATING_AGGREGATES)
+
+
+# Миграция 11: поиск идет через FTS и LIKE '%...%', индексы
+# нормализованных полей им не помогают и только замедляют запись книг
+async def _drop_book_normalized_indexes(conn: AsyncConnection):
+    await conn.execute(text("DROP INDEX IF EXISTS ix_books_title_normalized"))
+    await conn.execute(
+        text("DROP INDEX IF EXISTS ix_books_author_normalized"),
+    )
+
+
+# Список миграций: (версия схемы, описание, функция миграции).
+# Новые миграции добавляются только в конец списка
+MIGRATIONS = [
+    (1, "create books_fts search index", _create_books_fts),
+    (2, "create composite and unique indexes", _create_indexes),
+    (3, "add telegram file ids", _add_telegram_file_ids),
+    (4, "add book rating aggregates", _add_book_rating_aggregates),
+    (5, "create books visibility indexes", _create_books_visibility_indexes),
+    (6, "add book normalized fields", _add_book_normalized_fields),
+    (7, "fill book trigrams", _fill_book_trigrams),
+    (8, "create pages_fts search index", _create_pages_fts),
+    (9, "move fsm_states to a separate database", _drop_fsm_states),
+    (10, "round review ratings", _round_review_ratings),
+    (11, "drop book normalized indexes", _drop_book_normalized_indexes),
+]
+
+
+async def run_migrations(conn: AsyncConnection):
+    """
+    Применяет к базе данных миграции, версия которых выше текущей.
+    Версия схемы хранится в PRAGMA user_version файла базы данных.
+    """
+    version = await conn.scalar(text("PRAGMA user_version"))
+
+    for migration_version, description, migration in MIGRATIONS:
+        if migration_version <= version:
+            continue
+
+        logger.info(
+            f"Applying database migration {migration_version}: "
+            f"{description}",
+        )
+        await migration(conn)
+        await conn.execute(text(f"PRAGMA user_version = {migration_version}"))
@@ -7,7 +7,9 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    event,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -15,14 +17,53 @@ from sqlalchemy import (
     Text,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import column, table
 
 from database.db_session import SqlAlchemyBase
+from database.normalization import normalize_text
 
 book_genre = Table(
     "book_genre",
     SqlAlchemyBase.metadata,
     Column("book_id", Integer, ForeignKey("books.book_id")),
     Column("genre_id", Integer, ForeignKey("genres.genre_id")),
+    Index(
+        "ix_book_genre_book_id_genre_id",
+        "book_id",
+        "genre_id",
+        unique=True,
+    ),
+    Index("ix_book_genre_genre_id", "genre_id"),
+)
+
+# Полнотекстовый индекс FTS5 по нормализованным полям книги (rowid = book_id).
+# Виртуальная таблица создается миграцией в database.migrations, поэтому
+# здесь она описана легковесно и не попадает в metadata.create_all
+books_fts = table(
+    "books_fts",
+    column("rowid", Integer),
+    column("title", Text),
+    column("author", Text),
+    column("description", Text),
+)
+
+# Полнотекстовый индекс FTS5 по тексту страниц книг (rowid = page_id).
+# Хранит только индекс, сам текст берется из таблицы pages
+pages_fts = table(
+    "pages_fts",
+    column("rowid", Integer),
+    column("text", Text),
+)
+
+# Триграммы слов нормализованных названия и автора книги для нечеткого поиска
+book_trigrams = Table(
+    "book_trigrams",
+    SqlAlchemyBase.metadata,
+    Column("trigram", String(3), nullable=False),
+    Column("word", String(255), nullable=False),
+    Column("book_id", Integer, ForeignKey("books.book_id"), nullable=False),
+    Index("ix_book_trigrams_trigram_book_id", "trigram", "book_id", "word"),
+    Index("ix_book_trigrams_book_id", "book_id"),
 )
 
 
@@ -43,13 +84,29 @@ class User(SqlAlchemyBase):
 
 class Book(SqlAlchemyBase):
     __tablename__ = "books"
+    __table_args__ = (
+        # Покрывающий индекс для условия видимости книги
+        # (is_public OR uploader_id = :user)
+        Index("ix_books_is_public_uploader_id", "is_public", "uploader_id"),
+        Index("ix_books_uploader_id", "uploader_id"),
+    )
 
     book_id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(255), nullable=False)
     author = Column(String(255))
     description = Column(Text)
+    # Нормализованные копии полей для поиска,
+    # пересчитываются при каждом сохранении книги
+    title_normalized = Column(String(255))
+    author_normalized = Column(String(255))
+    description_normalized = Column(Text)
     is_public = Column(Boolean, default=True)
     uploader_id = Column(BigInteger, ForeignKey("users.user_id"))
+    # file_id обложки в Telegram, чтобы не загружать её повторно
+    cover_file_id = Column(String(255))
+    # Агрегаты оценок, обновляемые вместе с отзывами
+    rating_sum = Column(Numeric(10, 1), nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
 
     uploader = relationship("User", back_populates="books")
     bookmarks = relationship("Bookmark", back_populates="book")
@@ -64,16 +121,27 @@ class Book(SqlAlchemyBase):
 
     @property
     def average_rating(self):
-        if not self.reviews:  # Если нет отзывов
+        if not self.rating_count:  # Если нет отзывов
             return 0.0  # или None, в зависимости от вашей логики
 
-        total = sum(review.rating for review in self.reviews)
-        return round(total / len(self.reviews), 1)
+        return round(float(self.rating_sum) / self.rating_count, 1)
         # Округляем до 1 знака после запятой
 
 
+@event.listens_for(Book, "before_insert")
+@event.listens_for(Book, "before_update")
+def _normalize_book_fields(mapper, connection, book: Book):
+    """Пересчитывает нормализованные поля книги при ее сохранении"""
+    book.title_normalized = normalize_text(book.title)
+    book.author_normalized = normalize_text(book.author)
+    book.description_normalized = normalize_text(book.description)
+
+
 class Page(SqlAlchemyBase):
     __tablename__ = "pages"
+    __table_args__ = (
+        Index("ix_pages_book_id_num", "book_id", "num", unique=True),
+    )
 
     page_id = Column(Integer, primary_key=True, autoincrement=True)
     book_id = Column(Integer, ForeignKey("books.book_id"))
@@ -98,6 +166,10 @@ class Genre(SqlAlchemyBase):
 
 class Audiobook(SqlAlchemyBase):
     __tablename__ = "audiobooks"
+    __table_args__ = (
+        Index("ix_audiobooks_book_id", "book_id"),
+        Index("ix_audiobooks_uploader_id", "uploader_id"),
+    )
 
     audiobook_id = Column(Integer, primary_key=True, autoincrement=True)
     book_id = Column(Integer, ForeignKey("books.book_id"))  # Связь с книгой
@@ -106,6 +178,8 @@ class Audiobook(SqlAlchemyBase):
     audio_url = Column(String(512))  # Ссылка на файл
     # Кто загрузил
     uploader_id = Column(BigInteger, ForeignKey("users.user_id"))
+    # file_id аудиофайла в Telegram, чтобы не загружать его повторно
+    telegram_file_id = Column(String(255))
 
     book = relationship("Book", back_populates="audiobooks")
     uploader = relationship("User", back_populates="audiobooks")
@@ -113,6 +187,15 @@ class Audiobook(SqlAlchemyBase):
 
 class Bookmark(SqlAlchemyBase):
     __tablename__ = "bookmarks"
+    __table_args__ = (
+        Index(
+            "ix_bookmarks_user_id_book_id_page_number",
+            "user_id",
+            "book_id",
+            "page_number",
+            unique=True,
+        ),
+    )
 
     bookmark_id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"))
@@ -127,6 +210,11 @@ class Bookmark(SqlAlchemyBase):
 
 class Review(SqlAlchemyBase):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_book_id", "book_id"),
+        # У пользователя может быть только один отзыв на книгу
+        Index("ix_reviews_user_id_book_id", "user_id", "book_id", unique=True),
+    )
 
     review_id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"))
@@ -138,3 +226,32 @@ class Review(SqlAlchemyBase):
     # Связи
     user = relationship("User", back_populates="reviews")
     book = relationship("Book", back_populates="reviews")
+
+
+class TTSJob(SqlAlchemyBase):
+    """
+    Задача генерации аудиокниги (services.tts_jobs). Хранит контрольную
+    точку, с которой генерация продолжается после перезапуска бота
+    """
+
+    __tablename__ = "tts_jobs"
+    __table_args__ = (
+        Index("ix_tts_jobs_status", "status"),
+        Index("ix_tts_jobs_book_id", "book_id"),
+    )
+
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(Integer, ForeignKey("books.book_id"), nullable=False)
+    # Аудиокнига без файла, который появится по завершении задачи
+    audiobook_id = Column(Integer, ForeignKey("audiobooks.audiobook_id"))
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")
+    total_chunks = Column(Integer, nullable=False, default=0)
+    # Сколько фрагментов и байт уже записано в итоговый mp3
+    completed_chunks = Column(Integer, nullable=False, default=0)
+    output_size = Column(BigInteger, nullable=False, default=0)
+    # Сообщение, в котором показывается прогресс
+    progress_message_id = Column(BigInteger)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,33 @@
+__all__ = ()
+
+# Таблица перевода строится один раз: ё -> е, знаки препинания удаляются
+_NORMALIZE_TABLE = str.maketrans(
+    "ё",
+    "е",
+    "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~",
+)
+
+
+def normalize_text(text: str | None) -> str:
+    if not text:
+        return ""
+
+    return text.lower().translate(_NORMALIZE_TABLE)
+
+
+def get_word_trigrams(word: str) -> set[str]:
+    """Триграммы слова, дополненного пробелами по краям."""
+    padded = f" {word} "
+    return {padded[slice(i, i + 3)] for i in range(len(padded) - 2)}
+
+
+def book_trigram_rows(book_id: int, *normalized_texts: str | None) -> list:
+    """Строки таблицы book_trigrams для нормализованных полей книги."""
+    words = {
+        word for text in normalized_texts if text for word in text.split()
+    }
+    return [
+        {"trigram": trigram, "word": word, "book_id": book_id}
+        for word in words
+        for trigram in get_word_trigrams(word)
+    ]
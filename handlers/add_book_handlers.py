@@ -1,8 +1,6 @@
 __all__ = ()
 
-import asyncio
 import logging
-from math import ceil
 
 from aiogram import Bot, F, Router
 from aiogram.enums import ContentType
@@ -15,19 +13,21 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     Message,
 )
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Book, Genre
 from keyboards.genres_kb import create_genres_keyboard
 from lexicon import LEXICON
+from services.database_services import sqlite_index_book
 from services.file_handling import (
     cleanup_book_files,
-    get_book_text,
     prepare_book,
     save_book_files,
 )
-from services.gtts_api_services import generate_and_save_audiobook
+from services.genre_cache import get_genre_catalog
+from services.genre_index import genre_index
+from services.search_cache import invalidate_search_cache
+from services.tts_jobs import start_audiobook_job
 from states.states import FSMAddBook
 
 router = Router()
@@ -145,16 +145,15 @@ async def process_fill_book_description(
     add_book_dict = data.get("add_book", {})
     add_book_dict["description"] = description
 
-    all_genres = await session.execute(select(Genre))
-    all_genres = all_genres.scalars().all()
+    genre_catalog = await get_genre_catalog(session)
 
-    if not all_genres:
+    if not genre_catalog.genres:
         await message.answer(LEXICON["no_genres_in_database"])
         await state.set_state(default_state)
         return
 
     add_book_dict["genres_list_page"] = 1
-    add_book_dict["genres_list_length"] = ceil(len(all_genres) / 16)
+    add_book_dict["genres_list_length"] = genre_catalog.pages_count
 
     new_message = await message.answer(
         LEXICON["fill_genres"],
@@ -162,7 +161,7 @@ async def process_fill_book_description(
             [],
             add_book_dict["genres_list_page"],
             add_book_dict["genres_list_length"],
-            *all_genres[:16],
+            *genre_catalog.page(1),
         ),
     )
 
@@ -213,11 +212,7 @@ async def process_remove_genre(
     if int(callback.data.split("_")[-1]) in chosen_genres_ids:
         chosen_genres_ids.remove(int(callback.data.split("_")[-1]))
 
-    all_genres = await session.execute(select(Genre))
-    all_genres = all_genres.scalars().all()
-
-    genres_start_slice = (genres_list_page - 1) * 16
-    genres_stop_slice = (genres_list_page - 1) * 16 + 16
+    genre_catalog = await get_genre_catalog(session)
 
     await callback.message.edit_text(
         LEXICON["fill_genres"],
@@ -225,7 +220,7 @@ async def process_remove_genre(
             add_book_dict.get("chosen_genres_ids", []),
             add_book_dict["genres_list_page"],
             add_book_dict["genres_list_length"],
-            *all_genres[genres_start_slice:genres_stop_slice],
+            *genre_catalog.page(genres_list_page),
         ),
     )
     await state.update_data(add_book=add_book_dict)
@@ -259,23 +254,19 @@ async def process_choose_genre(
         add_book_dict["genres_list_page"] -= 1
 
     genres_list_page = add_book_dict["genres_list_page"]
-    all_genres = await session.execute(select(Genre))
-    all_genres = all_genres.scalars().all()
-    if not all_genres:
+    genre_catalog = await get_genre_catalog(session)
+    if not genre_catalog.genres:
         await callback.message.answer(LEXICON["no_genres_in_database"])
         await state.set_state(default_state)
         return
 
-    genres_start_slice = (genres_list_page - 1) * 16
-    genres_stop_slice = (genres_list_page - 1) * 16 + 16
-
     await callback.message.edit_text(
         LEXICON["fill_genres"],
         reply_markup=create_genres_keyboard(
             add_book_dict.get("chosen_genres_ids", []),
             add_book_dict["genres_list_page"],
             add_book_dict["genres_list_length"],
-            *all_genres[genres_start_slice:genres_stop_slice],
+            *genre_catalog.page(genres_list_page),
         ),
     )
     await state.update_data(add_book=add_book_dict)
@@ -322,13 +313,10 @@ async def process_select_genre(
 
     add_book_dict["chosen_genres_ids"] = chosen_genres
 
-    # Получаем все жанры для отображения
-    all_genres = await session.execute(select(Genre))
-    all_genres = all_genres.scalars().all()
+    # Получаем жанры для отображения
+    genre_catalog = await get_genre_catalog(session)
 
     genres_list_page = add_book_dict.get("genres_list_page", 1)
-    genres_start_slice = (genres_list_page - 1) * 16
-    genres_stop_slice = genres_start_slice + 16
 
     await callback.message.edit_text(
         LEXICON["fill_genres"],
@@ -336,7 +324,7 @@ async def process_select_genre(
             add_book_dict["chosen_genres_ids"],
             genres_list_page,
             add_book_dict["genres_list_length"],
-            *all_genres[genres_start_slice:genres_stop_slice],
+            *genre_catalog.page(genres_list_page),
         ),
     )
 
@@ -421,7 +409,7 @@ async def process_fill_book_cover(message: Message, state: FSMContext):
         await message.answer(LEXICON["add_book_error"])
         return
 
-    add_book_dict["cover"] = message.photo[-1]
+    add_book_dict["cover_file_id"] = message.photo[-1].file_id
     await message.answer(LEXICON["upload_text_file"])
     await state.update_data(add_book=add_book_dict)
     await state.set_state(FSMAddBook.upload_text_file)
@@ -453,6 +441,7 @@ async def process_upload_text_file(
             description=add_book_dict["description"],
             is_public=add_book_dict["is_public"],
             uploader_id=message.from_user.id,
+            cover_file_id=add_book_dict["cover_file_id"],
         )
 
         # Добавление жанров
@@ -462,29 +451,34 @@ async def process_upload_text_file(
                 book.genres.append(genre)
 
         session.add(book)
+        await session.flush()
+        await sqlite_index_book(session, book)
         await session.commit()
+        invalidate_search_cache()
+        genre_index.add_book(
+            book.book_id,
+            [genre.genre_id for genre in book.genres],
+            book.is_public,
+            book.uploader_id,
+        )
 
         # 2. Сохранение файлов через отдельный модуль
         await save_book_files(
             bot=bot,
             book=book,
             text_file_id=message.document.file_id,
-            cover_file_id=add_book_dict["cover"].file_id,
+            cover_file_id=add_book_dict["cover_file_id"],
         )
 
         # 3. Финализация
         await prepare_book(book.book_id)
 
-        # 4 Аудио
-        asyncio.create_task(
-            generate_and_save_audiobook(
-                bot=bot,
-                book=book,
-                user_id=message.from_user.id,
-                chat_id=message.chat.id,
-                book_text=await get_book_text(book.book_id),
-                session=session,
-            ),
+        # 4 Аудио: задача хранится в базе и продолжится после перезапуска
+        await start_audiobook_job(
+            bot,
+            book.book_id,
+            message.from_user.id,
+            message.chat.id,
         )
 
         # Очистка состояния
@@ -1,8 +1,6 @@
 __all__ = ()
 
-import asyncio
 import logging
-from pathlib import Path
 
 from aiogram import Bot, F, Router
 from aiogram.enums import ContentType
@@ -12,7 +10,6 @@ from aiogram.fsm.state import default_state
 from aiogram.types import (
     Audio,
     CallbackQuery,
-    FSInputFile,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     Message,
@@ -29,6 +26,7 @@ from services.database_services import (
     sqlite_get_audiobooks_with_book_user_by_uploader_id,
 )
 from services.file_handling import delete_audiobook_file, save_audiobook
+from services.handlers_services import answer_audiobook
 from states.states import FSMAddAudiobook
 
 router = Router()
@@ -53,20 +51,11 @@ async def send_audiobook(callback: CallbackQuery, session: AsyncSession):
             )
             return
 
-        # Проверяем существование файла
-        audio_path = Path(audiobook.audio_url)
-        if not await asyncio.to_thread(audio_path.exists):
+        # Отправляем аудиофайл
+        if not await answer_audiobook(callback.message, audiobook):
             await callback.answer(LEXICON["file_unavailable"], show_alert=True)
             return
 
-        await callback.message.answer(LEXICON["wait_for_listen_audio"])
-
-        # Отправляем аудиофайл
-        await callback.message.answer_audio(
-            audio=FSInputFile(audio_path),
-            title=f"{audiobook.book.title} | {audiobook.title}",
-            performer=audiobook.book.author,
-        )
         await callback.answer()
 
     except Exception as e:
@@ -108,8 +97,10 @@ async def process_book_audiobooks(
             await callback.message.answer(LEXICON["no_book_audiobooks"])
             return
 
+    # В состоянии храним только id аудиокниг, сами аудиокниги
+    # загружаются при листании
     audiobooks_results_dict = {
-        "audiobooks": audiobooks,
+        "audiobook_ids": [audiobook.audiobook_id for audiobook in audiobooks],
         "current_page": 1,
     }
     audiobook = audiobooks[0]
@@ -143,6 +134,7 @@ async def process_book_audiobooks(
 async def process_move_audiobooks_list(
     callback: CallbackQuery,
     state: FSMContext,
+    session: AsyncSession,
 ):
     await callback.answer()
     data = await state.get_data()
@@ -161,7 +153,10 @@ async def process_move_audiobooks_list(
         audiobooks_results_dict["current_page"] += 1
 
     current_page = audiobooks_results_dict["current_page"]
-    audiobook = audiobooks_results_dict["audiobooks"][current_page - 1]
+    audiobook = await sqlite_get_audiobook_with_book_user_by_audiobook_id(
+        session,
+        audiobooks_results_dict["audiobook_ids"][current_page - 1],
+    )
     if not audiobook:
         await callback.message.answer(LEXICON["audiobook_not_found"])
         return
@@ -181,7 +176,7 @@ async def process_move_audiobooks_list(
         f"{audiobook_title_label}: {audiobook.title}\n",
         reply_markup=create_audiobooks_keyboard(
             current_page,
-            len(audiobooks_results_dict["audiobooks"]),
+            len(audiobooks_results_dict["audiobook_ids"]),
             audiobook,
             is_user_audiobook=is_user_audiobook,
         ),
@@ -359,6 +354,7 @@ async def process_add_audiobook_audio(
             book_id=add_audiobook_dict["book_id"],
             title=add_audiobook_dict["fill_title"],
             uploader_id=message.from_user.id,
+            telegram_file_id=audio.file_id,
         )
 
         # Добавляем в сессию (чтобы получить ID)
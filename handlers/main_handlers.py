@@ -9,6 +9,7 @@ from aiogram.fsm.state import default_state
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config_data.config import config
 from keyboards.bookmarks_kb import create_bookmarks_keyboard
 from keyboards.search_kb import create_choose_search_keyboard
 from keyboards.start_kb import create_start_keyboard
@@ -17,6 +18,10 @@ from services.database_services import (
     sqlite_get_bookmarks_with_books_by_user_id,
 )
 from services.handlers_services import show_page
+from services.page_cache import page_cache
+from services.rate_limiter import tts_limiter
+from services.search_cache import search_cache
+from services.tts_cache import tts_cache
 
 router = Router()
 
@@ -113,3 +118,30 @@ async def process_start_search(event: Union[Message, CallbackQuery]):
             LEXICON["choose_search"],
             reply_markup=create_choose_search_keyboard(),
         )
+
+
+@router.message(
+    Command("cache_stats"),
+    F.from_user.id.in_(config.tg_bot.admin_ids),
+)
+async def process_cache_stats_command(message: Message):
+    texts = []
+    caches = (
+        ("pages", page_cache),
+        ("search", search_cache),
+        ("tts", tts_cache),
+    )
+    for name, cache in caches:
+        texts.append(LEXICON["cache_stats"].format(name=name, **cache.stats))
+
+    await message.answer("\n\n".join(texts))
+
+
+@router.message(
+    Command("tts_stats"),
+    F.from_user.id.in_(config.tg_bot.admin_ids),
+)
+async def process_tts_stats_command(message: Message):
+    await message.answer(
+        LEXICON["tts_limiter_stats"].format(**tts_limiter.state),
+    )
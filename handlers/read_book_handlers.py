@@ -16,13 +16,17 @@ from keyboards.book_view_kb import create_book_view_keyboard
 from lexicon import LEXICON
 from services.database_services import (
     sqlite_get_audiobook_ids_by_book_id,
-    sqlite_get_book_with_genres_audio_reviews_by_book_id,
+    sqlite_get_book_with_genres_audio_by_book_id,
     sqlite_get_bookmark_or_none,
-    sqlite_get_page_by_book_id_and_page_num,
     sqlite_get_total_book_pages,
+    sqlite_unindex_book,
 )
-from services.file_handling import delete_book_files, load_cover
-from services.handlers_services import show_page
+from services.file_handling import delete_book_files
+from services.genre_index import genre_index
+from services.handlers_services import answer_book_cover, show_page
+from services.page_cache import get_page_text, invalidate_book, prefetch_pages
+from services.search_cache import invalidate_search_cache
+from services.tts_jobs import delete_audiobook_jobs
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -47,6 +51,9 @@ async def process_delete_book(callback: CallbackQuery, session: AsyncSession):
             await callback.message.answer(LEXICON["no_access_to_delete_book"])
             return
 
+        # Останавливаем генерацию аудиокниги и удаляем её задачи
+        # до удаления файлов, в которые задачи еще могут писать
+        await delete_audiobook_jobs(session, book_id)
         audiobook_ids = await sqlite_get_audiobook_ids_by_book_id(
             session,
             book_id,
@@ -65,8 +72,12 @@ async def process_delete_book(callback: CallbackQuery, session: AsyncSession):
         await session.execute(
             delete(book_genre).where(book_genre.c.book_id == book_id),
         )
+        await sqlite_unindex_book(session, book_id)
         await session.delete(book)
         await session.commit()
+        invalidate_book(book_id)
+        invalidate_search_cache()
+        genre_index.remove_book(book_id)
 
         await callback.message.answer(LEXICON["book_delete_success"])
 
@@ -80,7 +91,7 @@ async def process_delete_book(callback: CallbackQuery, session: AsyncSession):
 async def process_book_cover(callback: CallbackQuery, session: AsyncSession):
     await callback.answer()
     book_id = int(callback.data.split("_")[-1])
-    book_view = await sqlite_get_book_with_genres_audio_reviews_by_book_id(
+    book_view = await sqlite_get_book_with_genres_audio_by_book_id(
         session,
         book_id,
     )
@@ -111,7 +122,6 @@ async def process_book_cover(callback: CallbackQuery, session: AsyncSession):
         f"{genres_label}: {genres_string}\n"
         f"{rating_label}: {rating}"
     )
-    cover_file = await load_cover(book_view.book_id)
     review = await session.scalar(
         select(Review).where(
             Review.book_id == book_view.book_id,
@@ -119,26 +129,19 @@ async def process_book_cover(callback: CallbackQuery, session: AsyncSession):
         ),
     )
     is_user_book = book_view.uploader_id == callback.from_user.id
-    if cover_file:
-        await callback.message.answer_photo(
-            photo=cover_file,
-            caption=text,
-            reply_markup=create_book_view_keyboard(
-                book_view.book_id,
-                is_user_book=is_user_book,
-                user_review=review,
-            ),
-        )
-    else:
+    keyboard = create_book_view_keyboard(
+        book_view.book_id,
+        is_user_book=is_user_book,
+        user_review=review,
+    )
+    if not await answer_book_cover(
+        callback.message,
+        book_view,
+        caption=text,
+        reply_markup=keyboard,
+    ):
         # Если обложки нет, отправляем просто текст
-        await callback.message.answer(
-            text=text,
-            reply_markup=create_book_view_keyboard(
-                book_view.book_id,
-                is_user_book=is_user_book,
-                user_review=review,
-            ),
-        )
+        await callback.message.answer(text=text, reply_markup=keyboard)
 
 
 @router.callback_query(
@@ -187,17 +190,15 @@ async def process_book_or_bookmark(
             await callback.message.answer(LEXICON["no_pages_in_book"])
             return
 
-        page = await sqlite_get_page_by_book_id_and_page_num(
-            session,
-            book_id,
-            page_num,
-        )
-        if not page:
+        page_text = await get_page_text(session, book_id, page_num)
+        if not page_text:
             await callback.message.answer(
                 LEXICON["page_not_found_error"].format(page_num=page_num),
             )
             return
 
+        prefetch_pages(book_id, page_num)
+
         # Проверяем актуальную закладку (если открываем не через закладку)
         if action == "read":
             bookmark = await sqlite_get_bookmark_or_none(
@@ -216,14 +217,14 @@ async def process_book_or_bookmark(
 
         # Отправляем новое сообщение
         new_message = await callback.message.answer(
-            text=page.text,
+            text=page_text,
             reply_markup=keyboard,
         )
 
         # Обновляем состояние
         await state.update_data(
             current_book={
-                "book": book,
+                "book_id": book.book_id,
                 "current_page": page_num,
                 "total_pages": total_pages,
             },
@@ -238,6 +239,40 @@ async def process_book_or_bookmark(
         await callback.message.answer(LEXICON["unknown_error"])
 
 
+@router.callback_query(F.data.startswith("open_page_"))
+async def process_open_found_page(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+):
+    await callback.answer()
+    # open_page_{book_id}_{page_num}
+    book_id, page_num = map(int, callback.data.split("_")[-2:])
+
+    book = await session.scalar(select(Book).where(Book.book_id == book_id))
+    if not book or not (
+        book.is_public or book.uploader_id == callback.from_user.id
+    ):
+        await callback.message.answer(LEXICON["book_not_found"])
+        return
+
+    total_pages = await sqlite_get_total_book_pages(session, book_id)
+    # Устаревшая кнопка не должна сбить текущую книгу читателя,
+    # поэтому номер страницы проверяем до изменения состояния
+    if not 1 <= page_num <= total_pages:
+        await callback.message.answer(LEXICON["page_not_found"])
+        return
+
+    await state.update_data(
+        current_book={
+            "book_id": book.book_id,
+            "current_page": page_num,
+            "total_pages": total_pages,
+        },
+    )
+    await show_page(callback, page_num, state, session)
+
+
 @router.callback_query(F.data.in_(["book_backward", "book_forward"]))
 async def process_current_book(
     callback: CallbackQuery,
@@ -260,13 +295,9 @@ async def process_current_book(
 
     current_page = current_book_dict["current_page"]
     total_pages = current_book_dict["total_pages"]
-    book_id = current_book_dict["book"].book_id
+    book_id = current_book_dict["book_id"]
 
-    page = await sqlite_get_page_by_book_id_and_page_num(
-        session,
-        book_id,
-        current_page,
-    )
+    page_text = await get_page_text(session, book_id, current_page)
     bookmark = await sqlite_get_bookmark_or_none(
         session,
         callback.from_user.id,
@@ -274,12 +305,13 @@ async def process_current_book(
         current_page,
     )
 
-    if not page:
+    if not page_text:
         await callback.message.answer(LEXICON["page_not_found"])
         return
 
+    prefetch_pages(book_id, current_page)
     await callback.message.edit_text(
-        text=page.text,
+        text=page_text,
         reply_markup=create_book_pagination_keyboard(
             current_page,
             total_pages,
@@ -327,26 +359,31 @@ async def process_add_bookmark(
     current_book_dict = data["current_book"]
     current_page = current_book_dict["current_page"]
     total_pages = current_book_dict["total_pages"]
-    book_id = current_book_dict["book"].book_id
-    page = await sqlite_get_page_by_book_id_and_page_num(
-        session,
-        book_id,
-        current_book_dict["current_page"],
-    )
-    if not page:
+    book_id = current_book_dict["book_id"]
+    page_text = await get_page_text(session, book_id, current_page)
+    if not page_text:
         await callback.message.answer(LEXICON["page_not_found"])
         return
 
-    bookmark = Bookmark(
-        user_id=callback.from_user.id,
-        book_id=book_id,
-        page_number=current_page,
-        note=page.text[:100],
+    # Закладка на страницу могла быть создана повторным нажатием
+    bookmark = await sqlite_get_bookmark_or_none(
+        session,
+        callback.from_user.id,
+        book_id,
+        current_page,
     )
-    session.add(bookmark)
-    await session.commit()
+    if not bookmark:
+        bookmark = Bookmark(
+            user_id=callback.from_user.id,
+            book_id=book_id,
+            page_number=current_page,
+            note=page_text[:100],
+        )
+        session.add(bookmark)
+        await session.commit()
+
     await callback.message.edit_text(
-        text=page.text,
+        text=page_text,
         reply_markup=create_book_pagination_keyboard(
             current_page,
             total_pages,
@@ -379,19 +416,15 @@ async def process_delete_bookmark_in_book(
     current_book_dict = data["current_book"]
     current_page = current_book_dict["current_page"]
     total_pages = current_book_dict["total_pages"]
-    book_id = current_book_dict["book"].book_id
-    page = await sqlite_get_page_by_book_id_and_page_num(
-        session,
-        book_id,  # ← первый аргумент (int)
-        current_book_dict["current_page"],  # ← второй аргумент (int)
-    )
+    book_id = current_book_dict["book_id"]
+    page_text = await get_page_text(session, book_id, current_page)
 
-    if not page:
+    if not page_text:
         await callback.message.answer(LEXICON["page_not_found"])
         return
 
     await callback.message.edit_text(
-        text=page.text,
+        text=page_text,
         reply_markup=create_book_pagination_keyboard(
             current_page,
             total_pages,
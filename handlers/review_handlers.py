@@ -22,7 +22,9 @@ from services.database_services import (
     sqlite_get_review_with_user_book_by_review_id,
     sqlite_get_reviews_with_user_books_by_user_id,
     sqlite_get_reviews_with_users_book_by_book_id,
+    sqlite_update_book_rating,
 )
+from services.genre_index import genre_index
 from states.states import FSMCreateReview
 
 router = Router()
@@ -63,8 +65,10 @@ async def process_book_review(
             await callback.message.answer(LEXICON["no_book_reviews"])
             return
 
+    # В состоянии храним только id отзывов, сами отзывы загружаются
+    # при листании
     reviews_results_dict = {
-        "reviews": reviews,
+        "review_ids": [review.review_id for review in reviews],
         "current_page": 1,
     }
     review = reviews[0]
@@ -104,6 +108,7 @@ async def process_book_review(
 async def process_move_reviews_list(
     callback: CallbackQuery,
     state: FSMContext,
+    session: AsyncSession,
 ):
     await callback.answer()
     data = await state.get_data()
@@ -122,7 +127,10 @@ async def process_move_reviews_list(
         reviews_results_dict["current_page"] += 1
 
     current_page = reviews_results_dict["current_page"]
-    review = reviews_results_dict["reviews"][current_page - 1]
+    review = await sqlite_get_review_with_user_book_by_review_id(
+        session,
+        reviews_results_dict["review_ids"][current_page - 1],
+    )
     if not review:
         await callback.message.answer(LEXICON["review_not_found"])
         return
@@ -146,7 +154,7 @@ async def process_move_reviews_list(
         f"{text_label}: {review.text}",
         reply_markup=create_reviews_keyboard(
             current_page,
-            len(reviews_results_dict["reviews"]),
+            len(reviews_results_dict["review_ids"]),
             review,
             is_user_review=is_user_review,
         ),
@@ -223,7 +231,16 @@ async def process_delete_review(
         return
 
     await session.delete(review)
+    rating = await sqlite_update_book_rating(
+        session,
+        review.book_id,
+        -review.rating,
+        -1,
+    )
     await session.commit()
+    if rating is not None:
+        genre_index.set_rating(review.book_id, rating)
+
     await callback.message.answer(LEXICON["review_delete_success"])
 
 
@@ -276,7 +293,9 @@ async def process_add_review_rating(message: Message, state: FSMContext):
             return
 
         try:
-            rating = float(rating)
+            # Оценка хранится с одним знаком после запятой (Numeric(2, 1)),
+            # это же значение попадает в агрегаты оценок книги
+            rating = round(float(rating), 1)
             if not 1 <= rating <= 5:
                 raise ValueError
         except ValueError:
@@ -328,11 +347,19 @@ async def process_add_review_text(
         )
         existing_reviews = existing_reviews.scalars().all()
 
+        # Заменяем старый отзыв и обновляем агрегаты оценок книги
+        # в одной транзакции с ним
         if existing_reviews:
             for review in existing_reviews:
                 await session.delete(review)
-
-            await session.commit()
+                await sqlite_update_book_rating(
+                    session,
+                    review.book_id,
+                    -review.rating,
+                    -1,
+                )
+
+            await session.flush()
         # Создаем новый отзыв
         review = Review(
             user_id=message.from_user.id,
@@ -342,7 +369,16 @@ async def process_add_review_text(
         )
 
         session.add(review)
+        rating = await sqlite_update_book_rating(
+            session,
+            review.book_id,
+            review.rating,
+            1,
+        )
         await session.commit()
+        # Индекс жанров меняем только после успешного коммита
+        if rating is not None:
+            genre_index.set_rating(review.book_id, rating)
 
         # Формируем клавиатуру для возврата
         keyboard = InlineKeyboardMarkup(
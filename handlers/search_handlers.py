@@ -1,5 +1,6 @@
 __all__ = ()
 
+from html import escape
 from math import ceil
 from typing import Union
 
@@ -13,25 +14,47 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     Message,
 )
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Book, Genre
-from keyboards.genres_kb import create_genres_keyboard
-from keyboards.search_kb import create_found_keyboard
+from database.models import Book
+from keyboards.genres_kb import create_search_genres_keyboard
+from keyboards.search_kb import (
+    create_found_keyboard,
+    create_found_pages_keyboard,
+    create_suggestions_keyboard,
+)
 from lexicon import LEXICON
 from services.database_services import (
-    sqlite_get_books_by_genre,
-    sqlite_search_books_by_any_field,
-    sqlite_search_books_by_author,
-    sqlite_search_books_by_description,
-    sqlite_search_books_by_title,
+    SNIPPET_MATCH_END,
+    SNIPPET_MATCH_START,
+    sqlite_fuzzy_search_book_ids,
+    sqlite_get_all_book_ids,
+    sqlite_get_book_ids_by_uploader_id,
+    sqlite_get_books_by_ids,
+    sqlite_search_book_ids_by_any_field,
+    sqlite_search_book_ids_by_author,
+    sqlite_search_book_ids_by_description,
+    sqlite_search_book_ids_by_title,
+    sqlite_search_pages,
 )
-from services.handlers_services import filter_public_books
+from services.genre_cache import get_genre_catalog
+from services.genre_index import get_genre_index, MAX_RATING
 from states.states import FSMSearchBook
 
 router = Router()
 
+# Количество книг на одной странице результатов поиска
+SEARCH_PAGE_SIZE = 8
+# Состояния поиска по названию и автору, для которых предлагаются
+# похожие книги, если точных совпадений нет
+FUZZY_SEARCH_STATES = frozenset(
+    (
+        "search_by_title_and_author",
+        "search_by_title",
+        "search_by_author",
+    ),
+)
+
 
 @router.callback_query(F.data.startswith("search_by"))
 async def process_choose_search(
@@ -53,27 +76,32 @@ async def process_choose_search(
     elif data == "search_by_description":
         await callback.message.answer(LEXICON["enter_description"])
         await state.set_state(FSMSearchBook.search_by_description)
+    elif data == "search_by_content":
+        await callback.message.answer(LEXICON["enter_content"])
+        await state.set_state(FSMSearchBook.search_by_content)
     elif data == "search_by_genre":
-        all_genres = await session.execute(select(Genre))
-        all_genres = all_genres.scalars().all()
-        if not all_genres:
+        genre_catalog = await get_genre_catalog(session)
+        if not genre_catalog.genres:
             await callback.message.answer(LEXICON["no_genres_in_database"])
             await state.set_state(default_state)
             return
 
-        genres_list_length = ceil(len(all_genres) / 16)
+        search_by_genres_dict = {
+            "current_page": 1,
+            "length": genre_catalog.pages_count,
+            "chosen_ids": [],
+            "match_all": True,
+            "min_rating": 0,
+        }
         new_message = await callback.message.answer(
             LEXICON["choose_genre"],
-            reply_markup=create_genres_keyboard(
-                [],
-                1,
-                genres_list_length,
-                *all_genres[:16],
-                confirm_button=False,
+            reply_markup=_create_search_genres_keyboard(
+                genre_catalog,
+                search_by_genres_dict,
             ),
         )
         await state.update_data(
-            search_by_genres={"current_page": 1, "length": genres_list_length},
+            search_by_genres=search_by_genres_dict,
             active_search_by_genres_message_id=new_message.message_id,
         )
         await state.set_state(FSMSearchBook.search_by_genre)
@@ -108,24 +136,73 @@ async def process_choose_genre(
     elif callback.data == "genres_list_backward":
         search_by_genres_dict["current_page"] -= 1
 
-    genres_list_page = search_by_genres_dict["current_page"]
-    all_genres = await session.execute(select(Genre))
-    if not all_genres:
+    genre_catalog = await get_genre_catalog(session)
+    if not genre_catalog.genres:
         await callback.message.answer(LEXICON["no_genres_in_database"])
         await state.set_state(default_state)
         return
 
-    all_genres = all_genres.scalars().all()
-    genres_start_slice = (genres_list_page - 1) * 16
-    genres_stop_slice = (genres_list_page - 1) * 16 + 16
     await callback.message.edit_text(
         LEXICON["fill_genres"],
-        reply_markup=create_genres_keyboard(
-            [],
-            genres_list_page,
-            search_by_genres_dict["length"],
-            *all_genres[genres_start_slice:genres_stop_slice,],
-            confirm_button=False,
+        reply_markup=_create_search_genres_keyboard(
+            genre_catalog,
+            search_by_genres_dict,
+        ),
+    )
+    await state.update_data(search_by_genres=search_by_genres_dict)
+
+
+@router.callback_query(
+    StateFilter(FSMSearchBook.search_by_genre),
+    or_f(
+        F.data.startswith("choose_genre_"),
+        F.data.startswith("remove_genre_"),
+        F.data.in_(["genres_match_mode", "genres_min_rating"]),
+    ),
+)
+async def process_change_search_genres(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+):
+    """Выбор жанров и параметров поиска по жанрам"""
+    await callback.answer()
+    data = await state.get_data()
+
+    active_search_by_genres_message_id = data.get(
+        "active_search_by_genres_message_id",
+    )
+    if callback.message.message_id != active_search_by_genres_message_id:
+        await callback.answer(LEXICON["old_message_alert"], show_alert=True)
+        return
+
+    search_by_genres_dict = data.get("search_by_genres")
+    if not search_by_genres_dict:
+        await callback.answer(LEXICON["search_error"])
+        return
+
+    chosen_ids = search_by_genres_dict["chosen_ids"]
+    if callback.data == "genres_match_mode":
+        search_by_genres_dict["match_all"] = not search_by_genres_dict[
+            "match_all"
+        ]
+    elif callback.data == "genres_min_rating":
+        search_by_genres_dict["min_rating"] = (
+            search_by_genres_dict["min_rating"] + 1
+        ) % (MAX_RATING + 1)
+    else:
+        genre_id = int(callback.data.split("_")[-1])
+        if genre_id in chosen_ids:
+            chosen_ids.remove(genre_id)
+        else:
+            chosen_ids.append(genre_id)
+
+    genre_catalog = await get_genre_catalog(session)
+    await callback.message.edit_text(
+        LEXICON["fill_genres"],
+        reply_markup=_create_search_genres_keyboard(
+            genre_catalog,
+            search_by_genres_dict,
         ),
     )
     await state.update_data(search_by_genres=search_by_genres_dict)
@@ -157,7 +234,7 @@ async def process_search_all(
 )
 @router.callback_query(
     StateFilter(FSMSearchBook.search_by_genre),
-    F.data.startswith("choose_genre"),
+    F.data == "genres_search",
 )
 async def process_search(
     event: Union[Message, CallbackQuery],
@@ -165,6 +242,7 @@ async def process_search(
     session: AsyncSession,
 ):
     search_user_books = False
+    header = None
     if isinstance(event, Message):
         message = event
         text = event.text
@@ -173,19 +251,59 @@ async def process_search(
         message = event.message
         text = ""
 
+    user_id = event.from_user.id
     current_state = (await state.get_state()).split(":")[-1]
     if current_state == "search_by_title_and_author":
-        books = await sqlite_search_books_by_any_field(session, text)
+        book_ids = await sqlite_search_book_ids_by_any_field(
+            session,
+            text,
+            user_id,
+        )
     elif current_state == "search_by_title":
-        books = await sqlite_search_books_by_title(session, text)
+        book_ids = await sqlite_search_book_ids_by_title(
+            session,
+            text,
+            user_id,
+        )
     elif current_state == "search_by_author":
-        books = await sqlite_search_books_by_author(session, text)
+        book_ids = await sqlite_search_book_ids_by_author(
+            session,
+            text,
+            user_id,
+        )
     elif current_state == "search_by_description":
-        books = await sqlite_search_books_by_description(session, text)
+        book_ids = await sqlite_search_book_ids_by_description(
+            session,
+            text,
+            user_id,
+        )
     elif current_state == "search_by_genre":
-        genre_id = int(event.data.split("_")[-1])
-        books = await sqlite_get_books_by_genre(session, genre_id)
         data = await state.get_data()
+        search_by_genres_dict = data.get("search_by_genres")
+        if not search_by_genres_dict:
+            await message.answer(LEXICON["search_error"])
+            return
+
+        if not search_by_genres_dict["chosen_ids"]:
+            await message.answer(LEXICON["no_genres_chosen"])
+            return
+
+        index = await get_genre_index(session)
+        book_ids = index.search(
+            search_by_genres_dict["chosen_ids"],
+            search_by_genres_dict["match_all"],
+            user_id,
+            search_by_genres_dict["min_rating"],
+        )
+        header = _format_genre_facets(
+            await get_genre_catalog(session),
+            index.facet_counts(
+                search_by_genres_dict["chosen_ids"],
+                user_id,
+                search_by_genres_dict["min_rating"],
+            ),
+            len(book_ids),
+        )
         if data.get("search_by_genres"):
             del data["search_by_genres"]
 
@@ -194,37 +312,39 @@ async def process_search(
 
         await state.update_data(data)
     elif current_state == "search_all":
-        books = await session.execute(select(Book))
-        books = books.scalars().all()
+        book_ids = await sqlite_get_all_book_ids(session, user_id)
     elif current_state == "search_user_books":
-        books = await session.execute(
-            select(Book).where(Book.uploader_id == event.from_user.id),
-        )
-        books = books.scalars().all()
+        book_ids = await sqlite_get_book_ids_by_uploader_id(session, user_id)
         search_user_books = True
     else:
-        books = None
+        book_ids = []
+
+    if current_state == "search_by_genre" and not book_ids:
+        # Показываем число книг по выбранным жанрам и при пустом результате
+        await message.answer(header)
+        return
 
-    books = await filter_public_books(books, event.from_user.id)
-    if books:
-        length_search_results = ceil(len(books) / 8)
+    if book_ids:
+        # В состоянии храним только id найденных книг,
+        # сами книги загружаются постранично
+        length_search_results = ceil(len(book_ids) / SEARCH_PAGE_SIZE)
         search_results_dict = {
-            "books": books,
+            "book_ids": book_ids,
             "current_page": 1,
             "length": length_search_results,
             "search_user_books": search_user_books,
+            "header": header,
         }
-        texts = []
-        for i, book in enumerate(books[:8]):
-            prefix = LEXICON[f"enumeration_{i + 1}"]
-            texts.append(f"{prefix} <b>{book.title}</b> - {book.author}")
-
+        page_books = await sqlite_get_books_by_ids(
+            session,
+            book_ids[:SEARCH_PAGE_SIZE],
+        )
         new_message = await message.answer(
-            "\n\n".join(texts),
+            _format_search_results(page_books, header),
             reply_markup=create_found_keyboard(
                 1,
                 length_search_results,
-                *books[:8],
+                *page_books,
                 add_book=search_user_books,
             ),
         )
@@ -252,16 +372,41 @@ async def process_search(
                 ),
             )
             await state.set_state(default_state)
+        elif current_state in FUZZY_SEARCH_STATES:
+            await _answer_suggestions(message, state, session, text)
         else:
             await message.answer(LEXICON["no_books_found"])
 
 
+@router.message(StateFilter(FSMSearchBook.search_by_content))
+async def process_search_by_content(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+):
+    found_pages = await sqlite_search_pages(
+        session,
+        message.text,
+        message.from_user.id,
+    )
+    if not found_pages:
+        await message.answer(LEXICON["no_books_found"])
+        return
+
+    await message.answer(
+        _format_found_pages(found_pages),
+        reply_markup=create_found_pages_keyboard(*found_pages),
+    )
+    await state.set_state(default_state)
+
+
 @router.callback_query(
     F.data.in_(["search_results_backward", "search_results_forward"]),
 )
 async def process_move_search_results(
     callback: CallbackQuery,
     state: FSMContext,
+    session: AsyncSession,
 ):
     await callback.answer()
     data = await state.get_data()
@@ -285,17 +430,21 @@ async def process_move_search_results(
         search_results_dict["current_page"] += 1
 
     current_list_page = search_results_dict["current_page"]
-    list_start_slice = (current_list_page - 1) * 8
-    list_stop_slice = (current_list_page - 1) * 8 + 8
-    books = search_results_dict["books"][list_start_slice:list_stop_slice]
+    list_start_slice = (current_list_page - 1) * SEARCH_PAGE_SIZE
+    list_stop_slice = list_start_slice + SEARCH_PAGE_SIZE
+    books = await sqlite_get_books_by_ids(
+        session,
+        search_results_dict["book_ids"][list_start_slice:list_stop_slice],
+    )
+    if not books:
+        # Книги страницы могли быть удалены после поиска
+        await callback.message.answer(LEXICON["search_error"])
+        return
+
     length_search_results = search_results_dict["length"]
-    texts = []
-    for i, book in enumerate(books):
-        prefix = LEXICON[f"enumeration_{i + 1}"]
-        texts.append(f"{prefix} <b>{book.title}</b> - {book.author}")
 
     await callback.message.edit_text(
-        "\n\n".join(texts),
+        _format_search_results(books, search_results_dict.get("header")),
         reply_markup=create_found_keyboard(
             current_list_page,
             length_search_results,
@@ -303,3 +452,83 @@ async def process_move_search_results(
             add_book=search_results_dict["search_user_books"],
         ),
     )
+    await state.update_data(search_results=search_results_dict)
+
+
+async def _answer_suggestions(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    text: str,
+):
+    """Предлагает похожие книги, если точный поиск ничего не нашел"""
+    book_ids = await sqlite_fuzzy_search_book_ids(
+        session,
+        text,
+        message.from_user.id,
+    )
+    if not book_ids:
+        await message.answer(LEXICON["no_books_found"])
+        return
+
+    books = await sqlite_get_books_by_ids(session, book_ids)
+    await message.answer(
+        f"{LEXICON['no_books_found']}\n\n{LEXICON['did_you_mean']}\n\n"
+        f"{_format_search_results(books)}",
+        reply_markup=create_suggestions_keyboard(*books),
+    )
+    await state.set_state(default_state)
+
+
+def _format_search_results(
+    books: list[Book],
+    header: str | None = None,
+) -> str:
+    texts = [header] if header else []
+    for i, book in enumerate(books):
+        prefix = LEXICON[f"enumeration_{i + 1}"]
+        texts.append(f"{prefix} <b>{book.title}</b> - {book.author}")
+
+    return "\n\n".join(texts)
+
+
+def _format_found_pages(found_pages) -> str:
+    texts = []
+    for i, (book, page_num, snippet) in enumerate(found_pages):
+        prefix = LEXICON[f"enumeration_{i + 1}"]
+        # Текст книги экранируется, совпадения выделяются жирным
+        snippet = (
+            escape(snippet.replace("\n", " "))
+            .replace(SNIPPET_MATCH_START, "<b>")
+            .replace(SNIPPET_MATCH_END, "</b>")
+        )
+        texts.append(
+            f"{prefix} <b>{book.title}</b> - {book.author}, "
+            f"{LEXICON['page_abbreviation']} {page_num}\n<i>{snippet}</i>",
+        )
+
+    return "\n\n".join(texts)
+
+
+def _create_search_genres_keyboard(genre_catalog, search_by_genres_dict):
+    return create_search_genres_keyboard(
+        search_by_genres_dict["chosen_ids"],
+        search_by_genres_dict["current_page"],
+        search_by_genres_dict["length"],
+        *genre_catalog.page(search_by_genres_dict["current_page"]),
+        match_all=search_by_genres_dict["match_all"],
+        min_rating=search_by_genres_dict["min_rating"],
+    )
+
+
+def _format_genre_facets(genre_catalog, facet_counts: dict, count: int):
+    genre_names = {
+        genre.genre_id: genre.name for genre in genre_catalog.genres
+    }
+    lines = [LEXICON["genres_facets"]]
+    lines.extend(
+        f"• {genre_names.get(genre_id, genre_id)}: {genre_count}"
+        for genre_id, genre_count in facet_counts.items()
+    )
+    lines.append(LEXICON["found_books_count"].format(count=count))
+    return "\n".join(lines)
@@ -1,37 +1,31 @@
 __all__ = ()
 
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.models import Genre
 from lexicon import LEXICON
+from services.genre_cache import CatalogGenre
 
 
-def create_genres_keyboard(
-    chosen_ids: list,
-    current_list_page,
-    list_length,
-    *genres: Genre,
-    confirm_button=True,
-) -> InlineKeyboardMarkup:
-    kb_builder = InlineKeyboardBuilder()
-    for i in range(len(genres)):
-        if genres[i].genre_id in chosen_ids:
-            kb_builder.row(
-                InlineKeyboardButton(
-                    text=f"{LEXICON['chosen']} {genres[i].name}",
-                    callback_data=f"remove_genre_{genres[i].genre_id}",
-                ),
-            )
-        else:
-            kb_builder.row(
-                InlineKeyboardButton(
-                    text=genres[i].name,
-                    callback_data=f"choose_genre_{genres[i].genre_id}",
-                ),
-            )
+@lru_cache(maxsize=1024)
+def _genre_button(genre_id: int, name: str, chosen: bool):
+    # Кнопки жанров не меняются, поэтому создаются один раз
+    # и переиспользуются во всех клавиатурах
+    if chosen:
+        return InlineKeyboardButton(
+            text=f"{LEXICON['chosen']} {name}",
+            callback_data=f"remove_genre_{genre_id}",
+        )
 
-    kb_builder.adjust(2)
+    return InlineKeyboardButton(
+        text=name,
+        callback_data=f"choose_genre_{genre_id}",
+    )
+
+
+@lru_cache(maxsize=256)
+def _pagination_row(current_list_page, list_length) -> tuple:
     inline_buttons = []
     if current_list_page != 1:
         inline_buttons.append(
@@ -55,13 +49,81 @@ def create_genres_keyboard(
             ),
         )
 
-    kb_builder.row(*inline_buttons, width=3)
+    return tuple(inline_buttons)
+
+
+@lru_cache(maxsize=1)
+def _confirm_button() -> InlineKeyboardButton:
+    return InlineKeyboardButton(
+        text=LEXICON["confirm_genres"],
+        callback_data="confirm_genres",
+    )
+
+
+def _genre_rows(chosen_ids, current_list_page, list_length, genres) -> list:
+    chosen_ids = set(chosen_ids)
+    buttons = [
+        _genre_button(genre.genre_id, genre.name, genre.genre_id in chosen_ids)
+        for genre in genres
+    ]
+    # Жанры по два в ряд, под ними пагинация
+    rows = [buttons[slice(i, i + 2)] for i in range(0, len(buttons), 2)]
+    rows.append(list(_pagination_row(current_list_page, list_length)))
+    return rows
+
+
+def create_genres_keyboard(
+    chosen_ids: list,
+    current_list_page,
+    list_length,
+    *genres: CatalogGenre,
+    confirm_button=True,
+) -> InlineKeyboardMarkup:
+    rows = _genre_rows(chosen_ids, current_list_page, list_length, genres)
     if confirm_button:
-        kb_builder.row(
+        rows.append([_confirm_button()])
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def create_search_genres_keyboard(
+    chosen_ids: list,
+    current_list_page,
+    list_length,
+    *genres: CatalogGenre,
+    match_all: bool,
+    min_rating: int,
+) -> InlineKeyboardMarkup:
+    rows = _genre_rows(chosen_ids, current_list_page, list_length, genres)
+    rows.append(
+        [
             InlineKeyboardButton(
-                text=LEXICON["confirm_genres"],
-                callback_data="confirm_genres",
+                text=LEXICON[
+                    "genres_match_all" if match_all else "genres_match_any"
+                ],
+                callback_data="genres_match_mode",
             ),
-        )
+        ],
+    )
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text=(
+                    LEXICON["genres_min_rating"].format(rating=min_rating)
+                    if min_rating
+                    else LEXICON["genres_any_rating"]
+                ),
+                callback_data="genres_min_rating",
+            ),
+        ],
+    )
+    rows.append(
+        [
+            InlineKeyboardButton(
+                text=LEXICON["genres_search"],
+                callback_data="genres_search",
+            ),
+        ],
+    )
 
-    return kb_builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -15,6 +15,7 @@ def create_choose_search_keyboard() -> InlineKeyboardMarkup:
         "search_by_title",
         "search_by_author",
         "search_by_description",
+        "search_by_content",
         "search_by_genre",
         "search_all",
     ]
@@ -79,3 +80,29 @@ def create_found_keyboard(
         )
 
     return kb_builder.as_markup()
+
+
+def create_suggestions_keyboard(*books: Book) -> InlineKeyboardMarkup:
+    kb_builder = InlineKeyboardBuilder()
+    for i in range(len(books)):
+        kb_builder.add(
+            InlineKeyboardButton(
+                text=f"{i + 1}",
+                callback_data=f"view_book_{books[i].book_id}",
+            ),
+        )
+
+    return kb_builder.as_markup()
+
+
+def create_found_pages_keyboard(*found_pages) -> InlineKeyboardMarkup:
+    kb_builder = InlineKeyboardBuilder()
+    for i, (book, page_num, _) in enumerate(found_pages):
+        kb_builder.add(
+            InlineKeyboardButton(
+                text=f"{i + 1}",
+                callback_data=f"open_page_{book.book_id}_{page_num}",
+            ),
+        )
+
+    return kb_builder.as_markup()
@@ -45,14 +45,26 @@ LEXICON: dict[str, str] = {
     "search_by_title": "📝 By title",
     "search_by_author": "👤 By author",
     "search_by_description": "📋 By description",
+    "search_by_content": "📄 By book text",
     "search_by_genre": "🏷️ By genre",
     "search_all": "📚 All books",
     "no_books_found": "😕 No books found",
+    "did_you_mean": "🤔 Maybe you meant:",
     "enter_title_and_author": "📖 Enter title and/or author",
     "enter_title": "📝 Enter book title",
     "enter_author": "👤 Enter book author",
     "enter_description": "📋 Enter book description",
+    "enter_content": "📄 Enter a phrase from the book text",
+    "page_abbreviation": "p.",
     "choose_genre": "📚 Choose book genre:",
+    "genres_match_all": "🔗 Books with all selected genres",
+    "genres_match_any": "🔀 Books with any selected genre",
+    "genres_min_rating": "⭐ Rating from {rating}",
+    "genres_any_rating": "⭐ Any rating",
+    "genres_search": "🔍 Search",
+    "no_genres_chosen": "⚠️ Choose at least one genre",
+    "genres_facets": "📊 Books by genre:",
+    "found_books_count": "🔎 Found: {count}",
     # Working with books
     "read_book": "📖 Read",
     "view_book_audiobooks": "🎧 Audio versions",
@@ -170,6 +182,7 @@ LEXICON: dict[str, str] = {
     "audio generation. You can add your own audio version via book menu",
     "gtts_start_generating": "ℹ️ Started generating audiobook {book_title}, "
     "it will run in background process, so you can use the bot",
+    "gtts_progress": "⏳ Done: {percent}%",
     "gtts_api_failure": "⚠️ Speech synthesis service is overloaded. "
     "Try again later or upload audio file manually.",
     # Statuses
@@ -189,6 +202,14 @@ LEXICON: dict[str, str] = {
     "rating_3": "⭐⭐⭐ (3/5)",
     "rating_4": "⭐⭐⭐⭐ (4/5)",
     "rating_5": "⭐⭐⭐⭐⭐ (5/5)",
+    # Administration
+    "cache_stats": "📊 Cache <b>{name}</b>\n"
+    "Hit ratio: {hit_ratio:.1%} ({hits} hits, {misses} misses)\n"
+    "Entries: {entries}, size: {size}/{max_size}, evictions: {evictions}",
+    "tts_limiter_stats": "🔊 TTS rate limiter\n"
+    "Rate: {rate:.2f}/{max_rate:.2f} per sec, tokens: {tokens:.1f}/{burst}\n"
+    "Waiting: {waiting}, granted: {acquired}, 429 responses: {penalties}\n"
+    "Cooldown: {cooldown:.1f} sec",
 }
 
 LEXICON_COMMANDS: dict[str, str] = {
@@ -45,14 +45,26 @@ LEXICON: dict[str, str] = {
     "search_by_title": "📝 По названию",
     "search_by_author": "👤 По автору",
     "search_by_description": "📋 По описанию",
+    "search_by_content": "📄 По тексту книги",
     "search_by_genre": "🏷️ По жанру",
     "search_all": "📚 Все книги",
     "no_books_found": "😕 Книги не найдены",
+    "did_you_mean": "🤔 Возможно, вы имели в виду:",
     "enter_title_and_author": "📖 Введите название и/или автора",
     "enter_title": "📝 Введите название книги",
     "enter_author": "👤 Введите автора книги",
     "enter_description": "📋 Введите описание книги",
+    "enter_content": "📄 Введите фразу из текста книги",
+    "page_abbreviation": "стр.",
     "choose_genre": "📚 Выберите жанр книги:",
+    "genres_match_all": "🔗 Книги со всеми выбранными жанрами",
+    "genres_match_any": "🔀 Книги с любым из выбранных жанров",
+    "genres_min_rating": "⭐ Рейтинг от {rating}",
+    "genres_any_rating": "⭐ Любой рейтинг",
+    "genres_search": "🔍 Найти",
+    "no_genres_chosen": "⚠️ Выберите хотя бы один жанр",
+    "genres_facets": "📊 Книг по жанрам:",
+    "found_books_count": "🔎 Найдено: {count}",
     # Работа с книгами
     "read_book": "📖 Читать",
     "view_book_audiobooks": "🎧 Аудиоверсии",
@@ -171,6 +183,7 @@ LEXICON: dict[str, str] = {
     "генерации аудио. Вы можете добавить свою аудиоверсию через меню книги",
     "gtts_start_generating": "ℹ️ Началась генерация аудиокниги {book_title}, "
     "она будет идти в фоновом процессе, поэтому вы можете использовать бот",
+    "gtts_progress": "⏳ Готово: {percent}%",
     "gtts_api_failure": "⚠️ Сервис синтеза речи перегружен и не отвечает. "
     "Попробуйте позже или загрузите аудиофайл вручную.",
     # Статусы
@@ -191,6 +204,15 @@ LEXICON: dict[str, str] = {
     "rating_3": "⭐⭐⭐ (3/5)",
     "rating_4": "⭐⭐⭐⭐ (4/5)",
     "rating_5": "⭐⭐⭐⭐⭐ (5/5)",
+    # Администрирование
+    "cache_stats": "📊 Кэш <b>{name}</b>\n"
+    "Попадания: {hit_ratio:.1%} ({hits} попаданий, {misses} промахов)\n"
+    "Записей: {entries}, объем: {size}/{max_size}, вытеснено: {evictions}",
+    "tts_limiter_stats": "🔊 Ограничитель запросов TTS\n"
+    "Скорость: {rate:.2f}/{max_rate:.2f} в сек., "
+    "токенов: {tokens:.1f}/{burst}\n"
+    "Ожидают: {waiting}, выдано: {acquired}, ответов 429: {penalties}\n"
+    "Пауза: {cooldown:.1f} сек.",
 }
 
 LEXICON_COMMANDS: dict[str, str] = {
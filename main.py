@@ -11,6 +11,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 
 from config_data.config import config
 from database import db_session
+from database.fsm_storage import SQLiteStorage
 from database.init_db import init_genres
 from handlers import (
     add_book_handlers,
@@ -25,11 +26,15 @@ from handlers import (
 from keyboards.main_menu import set_main_menu
 from middlewares.outer import (
     DatabaseMiddleware,
+    FSMBufferMiddleware,
     SearchValidationMiddleware,
     StateResetMiddleware,
     StateValidationMiddleware,
     UserMiddleware,
 )
+from services.genre_index import genre_index
+from services.tts_cache import load_tts_cache
+from services.tts_jobs import resume_audiobook_jobs, stop_audiobook_jobs
 
 # Инициализируем логгер
 logger = logging.getLogger(__name__)
@@ -49,10 +54,17 @@ async def main():
     # Выводим в консоль информацию о начале запуска бота
     logger.info("Starting bot")
 
-    storage = MemoryStorage()
-    await db_session.global_init("database/books.db")
+    await db_session.global_init(config.db.url, config.db.sqlite_profile)
+    # Состояния FSM в базе переживают перезапуск бота
+    if config.db.fsm_storage == "sqlite":
+        storage = SQLiteStorage(config.db.fsm_url, config.db.sqlite_profile)
+        await storage.init()
+    else:
+        storage = MemoryStorage()
+
     database_session = await db_session.create_session()
     await init_genres(database_session)
+    await genre_index.load(database_session)
 
     session = (
         AiohttpSession(proxy=config.proxy_url) if config.proxy_url else None
@@ -70,9 +82,14 @@ async def main():
     await set_main_menu(bot)
 
     # Регистрируем мидлвари в диспетчере
+    # Один экземпляр UserMiddleware, чтобы кэш пользователей был общим
+    user_middleware = UserMiddleware()
+    # FSMBufferMiddleware снаружи DatabaseMiddleware: состояние FSM
+    # записывается уже после коммита транзакции апдейта
+    dp.update.middleware(FSMBufferMiddleware())
     dp.update.middleware(DatabaseMiddleware())
-    dp.message.middleware(UserMiddleware())
-    dp.callback_query.middleware(UserMiddleware())
+    dp.message.middleware(user_middleware)
+    dp.callback_query.middleware(user_middleware)
     dp.callback_query.middleware(StateValidationMiddleware())
     dp.message.middleware(SearchValidationMiddleware())
     dp.message.middleware(StateResetMiddleware())
@@ -88,6 +105,16 @@ async def main():
     dp.include_router(read_book_handlers.router)
     dp.include_router(other_handlers.router)
 
+    # При остановке сохраняем отложенные изменения профилей пользователей
+    dp.shutdown.register(user_middleware.flush)
+    # и останавливаем генерацию аудиокниг на контрольных точках
+    dp.shutdown.register(stop_audiobook_jobs)
+
+    # Загружаем кэш озвученных фрагментов до запуска задач озвучивания
+    await load_tts_cache()
+    # Продолжаем генерацию аудиокниг, прерванную перезапуском
+    await resume_audiobook_jobs(bot)
+
     # Пропускаем накопившиеся апдейты и запускаем polling
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
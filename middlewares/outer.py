@@ -1,23 +1,31 @@
 __all__ = ()
 
-from typing import Any, Awaitable, Callable, Dict, Union
+import asyncio
+import copy
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from aiogram import BaseMiddleware
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import default_state
+from aiogram.fsm.state import default_state, State
+from aiogram.fsm.storage.base import StateType
 from aiogram.types import CallbackQuery, Message
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.db_session import create_session
-from database.models import User
+from database.db_session import create_session, LazySession
 from lexicon import LEXICON
+from services.cache import LRUCache
+from services.database_services import sqlite_upsert_users
 from states.states import FSMAddBook, FSMCreateReview
 
+logger = logging.getLogger(__name__)
 
-# Создание подключения к базе данных для пользователя
+
+# Создание подключения к базе данных для пользователя.
+# Сессия ленивая: хэндлеры, не работающие с базой, её не открывают
 class DatabaseMiddleware(BaseMiddleware):
     async def __call__(self, handler, event, data):
-        session = await create_session()  # Создаем сессию
+        session = LazySession()
         data["session"] = session
         try:
             result = await handler(event, data)
@@ -30,8 +38,139 @@ class DatabaseMiddleware(BaseMiddleware):
             await session.close()
 
 
-# Добавление пользователя в базу данных если его там ещё нет
+class BufferedFSMContext(FSMContext):
+    """
+    Контекст FSM на время одного апдейта. Состояние и данные читаются из
+    хранилища один раз, дальше мидлвари и хэндлер работают с копией в
+    памяти, а flush переносит в хранилище только измененные ключи.
+    """
+
+    _NOT_LOADED = object()
+
+    def __init__(self, context: FSMContext, raw_state: Optional[str]):
+        super().__init__(storage=context.storage, key=context.key)
+        self._state = self._original_state = raw_state
+        self._data = self._original_data = self._NOT_LOADED
+
+    async def set_state(self, state: StateType = None):
+        self._state = state.state if isinstance(state, State) else state
+
+    async def get_state(self) -> Optional[str]:
+        return self._state
+
+    async def set_data(self, data: Dict[str, Any]):
+        await self._load_data()
+        self._data = data.copy()
+
+    async def get_data(self) -> Dict[str, Any]:
+        await self._load_data()
+        return self._data.copy()
+
+    async def get_value(self, key: str, default: Any = None) -> Any:
+        await self._load_data()
+        return self._data.get(key, default)
+
+    async def update_data(
+        self,
+        data: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        await self._load_data()
+        if data:
+            kwargs.update(data)
+
+        self._data.update(kwargs)
+        return self._data.copy()
+
+    async def flush(self):
+        state_changed = self._state != self._original_state
+        changed, deleted = self._data_changes()
+        if not state_changed and not changed and not deleted:
+            return
+
+        data = None
+        if changed or deleted:
+            # Апдейты одного чата обрабатываются параллельно: переносим
+            # только измененные ключи на текущие данные хранилища, чтобы
+            # не затереть то, что за это время записал другой апдейт
+            data = await self.storage.get_data(self.key)
+            data.update(changed)
+            for key in deleted:
+                data.pop(key, None)
+
+        # Хранилище с методом set_state_and_data (например, SQLiteStorage)
+        # записывает состояние и данные одним запросом
+        set_state_and_data = getattr(self.storage, "set_state_and_data", None)
+        if state_changed and data is not None and set_state_and_data:
+            await set_state_and_data(self.key, self._state, data)
+        else:
+            if state_changed:
+                await self.storage.set_state(self.key, self._state)
+
+            if data is not None:
+                await self.storage.set_data(self.key, data)
+
+        self._original_state = self._state
+        if data is not None:
+            self._original_data = copy.deepcopy(self._data)
+
+    def _data_changes(self) -> tuple[dict, list]:
+        """Измененные и удаленные ключи данных относительно загруженных"""
+        if self._data is self._NOT_LOADED:
+            return {}, []
+
+        # Сравниваем с глубокой копией: хэндлеры могут изменять
+        # вложенные словари на месте
+        original = self._original_data
+        changed = {
+            key: value
+            for key, value in self._data.items()
+            if key not in original or original[key] != value
+        }
+        deleted = [key for key in original if key not in self._data]
+        return changed, deleted
+
+    async def _load_data(self):
+        if self._data is self._NOT_LOADED:
+            self._data = await self.storage.get_data(self.key)
+            self._original_data = copy.deepcopy(self._data)
+
+
+# Один контекст FSM на апдейт: мидлвари и хэндлеры читают состояние из
+# памяти, а изменения записываются в хранилище один раз в конце обработки
+class FSMBufferMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        context: FSMContext = data.get("state")
+        if not context:
+            return await handler(event, data)
+
+        buffered = BufferedFSMContext(context, data.get("raw_state"))
+        data["state"] = buffered
+        try:
+            return await handler(event, data)
+        finally:
+            await buffered.flush()
+
+
+# Добавление пользователя в базу данных если его там ещё нет.
+# Известные пользователи кэшируются, поэтому при обычной работе
+# запросов к таблице users нет, а изменения имен пишутся пачками
 class UserMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        cache_size: int = 10_000,
+        cache_ttl: float = 3600,
+        flush_batch_size: int = 100,
+        flush_interval: float = 60,
+    ):
+        # user_id -> (username, first_name, last_name)
+        self._known_users = LRUCache(cache_size, ttl=cache_ttl)
+        self._pending_profiles: dict[int, dict] = {}
+        self._flush_batch_size = flush_batch_size
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._flush_task: asyncio.Task | None = None
+
     async def __call__(
         self,
         handler: Callable[
@@ -41,35 +180,83 @@ class UserMiddleware(BaseMiddleware):
         event: Union[Message, CallbackQuery],
         data: Dict[str, Any],
     ) -> Any:
-        session: AsyncSession = data["session"]
-
         # Получаем пользователя из события
         if isinstance(event, (Message, CallbackQuery)):
             user_id = event.from_user.id
-            username = event.from_user.username
-            first_name = event.from_user.first_name
-            last_name = event.from_user.last_name
+            profile = {
+                "user_id": user_id,
+                "username": event.from_user.username,
+                "first_name": event.from_user.first_name,
+                "last_name": event.from_user.last_name,
+            }
         else:
             # Если это не Message/CallbackQuery, пропускаем middleware
             return await handler(event, data)
 
-        # Проверяем существование пользователя
-        user = await session.get(User, user_id)
-
-        if not user:
-            user = User(
-                user_id=user_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-            )
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)  # Обновляем атрибуты
+        cached_profile = self._known_users.get(user_id)
+        if cached_profile is None:
+            # Новый (или вытесненный из кэша) пользователь:
+            # добавляем или обновляем его одним запросом в отдельной
+            # короткой транзакции, чтобы не держать блокировку записи
+            # SQLite на время работы хэндлера
+            await self._register_user(profile)
+            self._pending_profiles.pop(user_id, None)
+            self._known_users.set(user_id, profile)
+        elif cached_profile != profile:
+            # Изменившиеся имена сохраняем отложенно
+            self._known_users.set(user_id, profile)
+            self._pending_profiles[user_id] = profile
+
+        self._schedule_flush()
 
-        data["user"] = user
         return await handler(event, data)
 
+    async def _register_user(self, profile: dict):
+        session = await create_session()
+        try:
+            await sqlite_upsert_users(session, [profile])
+            await session.commit()
+        finally:
+            await session.close()
+
+    async def flush(self):
+        """Сохраняет накопленные изменения профилей пользователей"""
+        self._last_flush = time.monotonic()
+        if not self._pending_profiles:
+            return
+
+        # Очередь очищаем только после успешного коммита: при ошибке
+        # изменения останутся в ней до следующей попытки
+        profiles = dict(self._pending_profiles)
+
+        session = await create_session()
+        try:
+            await sqlite_upsert_users(session, list(profiles.values()))
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.exception(f"Error saving user profiles: {e}")
+            return
+        finally:
+            await session.close()
+
+        for user_id, profile in profiles.items():
+            # Профиль, изменившийся во время записи, сохраним в следующий раз
+            if self._pending_profiles.get(user_id) is profile:
+                del self._pending_profiles[user_id]
+
+    def _schedule_flush(self):
+        if self._flush_task and not self._flush_task.done():
+            return
+
+        if (
+            len(self._pending_profiles) < self._flush_batch_size
+            and time.monotonic() - self._last_flush < self._flush_interval
+        ):
+            return
+
+        self._flush_task = asyncio.create_task(self.flush())
+
 
 # Обработка посторонних действий при заполнении данных о книге/отзыве
 class StateValidationMiddleware(BaseMiddleware):
@@ -246,6 +433,10 @@ class SearchValidationMiddleware(BaseMiddleware):
                     "genres_list_forward",
                     "genres_list_backward",
                     "choose_genre",
+                    "remove_genre",
+                    "genres_match_mode",
+                    "genres_min_rating",
+                    "genres_search",
                 }
 
                 if not any(
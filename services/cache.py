@@ -0,0 +1,133 @@
+__all__ = ()
+
+from collections import OrderedDict
+import time
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Ограниченный по размеру LRU-кэш со счетчиками попаданий и промахов.
+    Размер записи по умолчанию равен 1 (ограничение по количеству),
+    функция sizeof позволяет ограничивать кэш по объему данных.
+    Необязательный ttl задает время жизни записи в секундах, истекшие
+    записи из начала очереди удаляются при добавлении новых,
+    on_evict вызывается с ключом и значением вытесняемой по объему записи.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        # key -> (value, size, expires_at)
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or self._is_expired(entry):
+            if entry is not None:
+                self._remove(key)
+
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        if key in self._entries:
+            self._remove(key)
+
+        size = self._sizeof(value) if self._sizeof else 1
+        if size > self.max_size:
+            return
+
+        if self.ttl:
+            self._expire_oldest()
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, size, expires_at)
+        self._size += size
+        while self._size > self.max_size:
+            oldest_key = next(iter(self._entries))
+            oldest_value = self._remove(oldest_key)
+            self.evictions += 1
+            if self._on_evict:
+                self._on_evict(oldest_key, oldest_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._entries:
+            return default
+
+        return self._remove(key)
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Удаляет записи, ключи которых удовлетворяют условию"""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self._remove(key)
+
+        return len(keys)
+
+    def expire(self) -> int:
+        """Удаляет записи с истекшим временем жизни"""
+        return self.pop_where(
+            lambda key: self._is_expired(self._entries[key]),
+        )
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    @property
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    def _is_expired(self, entry: tuple) -> bool:
+        expires_at = entry[2]
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def _expire_oldest(self):
+        """
+        Удаляет истекшие записи из начала очереди LRU, чтобы редко
+        запрашиваемые записи не занимали место до полного обхода кэша
+        """
+        while self._entries:
+            oldest_key = next(iter(self._entries))
+            if not self._is_expired(self._entries[oldest_key]):
+                break
+
+            self._remove(oldest_key)
+
+    def _remove(self, key: Hashable) -> Any:
+        value, size, _ = self._entries.pop(key)
+        self._size -= size
+        return value
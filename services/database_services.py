@@ -1,116 +1,365 @@
 __all__ = ()
 
-from sqlalchemy import func, select
+from collections import defaultdict
+import heapq
+from typing import Optional
+
+from sqlalchemy import (
+    case,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
 
-from database.models import Audiobook, Book, Bookmark, Genre, Page, Review
+from database.models import (
+    Audiobook,
+    Book,
+    book_trigrams,
+    Bookmark,
+    books_fts,
+    Page,
+    pages_fts,
+    Review,
+    User,
+)
+from database.normalization import (
+    book_trigram_rows,
+    get_word_trigrams,
+    normalize_text,
+)
+from services.genre_index import average_rating
+from services.search_cache import get_visible_book_ids
+
+
+# Порог сходства и число вариантов для подсказок "возможно, вы имели в виду"
+FUZZY_SIMILARITY_THRESHOLD = 0.3
+FUZZY_SUGGESTIONS_LIMIT = 5
+
+# Число найденных страниц и длина фрагмента (в словах) при поиске по тексту
+PAGES_SEARCH_LIMIT = 8
+SNIPPET_TOKENS = 16
+# Служебные символы, которыми отмечаются совпадения во фрагменте
+SNIPPET_MATCH_START = "\x02"
+SNIPPET_MATCH_END = "\x03"
 
 
-def normalize_text(text: str | None) -> str:
-    if not text:
-        return ""
+def _process_search_query(query: str) -> list[str]:
+    """Обрабатывает поисковый запрос: нормализует и разбивает на слова."""
+    return normalize_text(query).split()
+
+
+def _build_search_conditions(search_words: list[str], fields: list[str]):
+    """
+    Строит условия поиска по нормализованным полям книги: каждое слово
+    запроса должно встречаться подстрокой хотя бы в одном из полей.
+    """
+    columns = " ".join(fields)
+    match_terms = []
+    conditions = []
+    for word in search_words:
+        # Триграммный токенизатор ищет через MATCH подстроки от 3 символов,
+        # более короткие слова проверяем через LIKE по той же таблице
+        if len(word) >= 3:
+            match_terms.append(f'{{{columns}}}: "{word}"')
+        else:
+            conditions.append(
+                or_(
+                    *(
+                        getattr(Book, f"{field}_normalized").contains(word)
+                        for field in fields
+                    ),
+                ),
+            )
+
+    if match_terms:
+        conditions.append(
+            text("books_fts MATCH :match_query").bindparams(
+                match_query=" AND ".join(match_terms),
+            ),
+        )
 
-    return (
-        text.lower()
-        .replace("ё", "е")
-        .translate(str.maketrans("", "", "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"))
-    )
+    return conditions
 
 
-def _process_search_query(query: str) -> list[str]:
-    """Обрабатывает поисковый запрос: нормализует и разбивает на слова."""
-    normalized_query = (
-        query.lower()
-        .replace("ё", "е")
-        .translate(str.maketrans("", "", "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"))
-        .strip()
+def _visible_to(user_id: int):
+    """Условие видимости книги: публичная или загружена пользователем."""
+    return or_(Book.is_public.is_(True), Book.uploader_id == user_id)
+
+
+def _select_book_ids_with_owners():
+    """
+    Выборка id книг вместе с владельцем приватной книги (None для
+    публичных), чтобы проверять видимость при чтении из кэша поиска.
+    """
+    return select(
+        Book.book_id,
+        case((Book.is_public.is_(True), None), else_=Book.uploader_id),
     )
 
-    return [word for word in normalized_query.split() if word]
+
+async def _fetch_book_ids_with_owners(session: AsyncSession, stmt) -> tuple:
+    result = await session.execute(stmt.order_by(Book.book_id))
+    return tuple(tuple(row) for row in result)
 
 
-async def _filter_books_by_fields(
+async def _search_book_ids_by_fields(
     session: AsyncSession,
     search_words: list[str],
     fields: list[str],
-    skip_if_empty: bool = False,
-) -> list[Book]:
+    user_id: int,
+) -> list[int]:
     if not search_words:
         return []
 
-    # Получаем все книги
-    all_books = (await session.execute(select(Book))).scalars().all()
+    stmt = (
+        _select_book_ids_with_owners()
+        .join(books_fts, books_fts.c.rowid == Book.book_id)
+        .where(*_build_search_conditions(search_words, fields))
+    )
+    return await get_visible_book_ids(
+        (tuple(fields), " ".join(search_words)),
+        user_id,
+        lambda: _fetch_book_ids_with_owners(session, stmt),
+    )
 
-    results = []
-    for book in all_books:
-        # Собираем нормализованные значения полей
-        field_values = []
 
-        for field in fields:
-            value = getattr(book, field)
+async def sqlite_index_book(session: AsyncSession, book: Book):
+    """Добавляет книгу в поисковый индекс (без коммита)."""
+    await sqlite_unindex_book(session, book.book_id)
+    await session.execute(
+        insert(books_fts).values(
+            rowid=book.book_id,
+            title=book.title_normalized,
+            author=book.author_normalized,
+            description=book.description_normalized,
+        ),
+    )
+    rows = book_trigram_rows(
+        book.book_id,
+        book.title_normalized,
+        book.author_normalized,
+    )
+    if rows:
+        await session.execute(insert(book_trigrams), rows)
 
-            # Пропускаем пустые поля, если требуется
-            if skip_if_empty and not value:
-                continue
 
-            field_values.append(normalize_text(value))
+async def sqlite_unindex_book(session: AsyncSession, book_id: int):
+    """Удаляет книгу из поискового индекса (без коммита)."""
+    await session.execute(
+        delete(books_fts).where(books_fts.c.rowid == book_id),
+    )
+    await session.execute(
+        delete(book_trigrams).where(book_trigrams.c.book_id == book_id),
+    )
 
-        # Пропускаем книгу, если все поля пустые
-        if not field_values:
-            continue
 
-        # Объединяем все поля в одну строку для поиска
-        book_data = " ".join(field_values)
+async def sqlite_fuzzy_search_book_ids(
+    session: AsyncSession,
+    query: str,
+    user_id: int,
+    limit: int = FUZZY_SUGGESTIONS_LIMIT,
+) -> list[int]:
+    """
+    Нечеткий поиск по названию и автору. Кандидаты выбираются по индексу
+    триграмм, для каждого слова запроса берется самое похожее слово книги
+    (коэффициент Жаккара), книги с оценкой ниже порога отбрасываются.
+    """
+    query_words = {
+        word: get_word_trigrams(word) for word in _process_search_query(query)
+    }
+    if not query_words:
+        return []
 
-        # Проверяем, содержатся ли ВСЕ слова запроса где-то в данных книги
-        if all(word in book_data for word in search_words):
-            results.append(book)
+    query_trigrams = set().union(*query_words.values())
+    stmt = (
+        select(book_trigrams.c.book_id, book_trigrams.c.word)
+        .join(Book, Book.book_id == book_trigrams.c.book_id)
+        .where(
+            book_trigrams.c.trigram.in_(query_trigrams),
+            _visible_to(user_id),
+        )
+    )
+    # Отсекаем случайные совпадения по одной триграмме
+    candidates = await session.execute(
+        stmt.group_by(book_trigrams.c.book_id, book_trigrams.c.word).having(
+            func.count() >= 2,
+        ),
+    )
 
-    return results
+    best_similarity = defaultdict(dict)
+    for book_id, word in candidates:
+        word_trigrams = get_word_trigrams(word)
+        for query_word, trigrams in query_words.items():
+            similarity = len(trigrams & word_trigrams) / len(
+                trigrams | word_trigrams,
+            )
+            book_scores = best_similarity[book_id]
+            if similarity > book_scores.get(query_word, 0):
+                book_scores[query_word] = similarity
+
+    scores = (
+        (sum(book_scores.values()) / len(query_words), book_id)
+        for book_id, book_scores in best_similarity.items()
+    )
+    return [
+        book_id
+        for score, book_id in heapq.nlargest(limit, scores)
+        if score >= FUZZY_SIMILARITY_THRESHOLD
+    ]
 
 
-async def sqlite_search_books_by_any_field(session: AsyncSession, query: str):
+async def sqlite_search_book_ids_by_any_field(
+    session: AsyncSession,
+    query: str,
+    user_id: int,
+) -> list[int]:
     """Поиск по названию ИЛИ автору."""
     search_words = _process_search_query(query)
-    return await _filter_books_by_fields(
+    return await _search_book_ids_by_fields(
         session=session,
         search_words=search_words,
         fields=["title", "author"],
+        user_id=user_id,
     )
 
 
-async def sqlite_search_books_by_title(session: AsyncSession, query: str):
+async def sqlite_search_book_ids_by_title(
+    session: AsyncSession,
+    query: str,
+    user_id: int,
+) -> list[int]:
     """Поиск только по названию."""
     search_words = _process_search_query(query)
-    return await _filter_books_by_fields(
+    return await _search_book_ids_by_fields(
         session=session,
         search_words=search_words,
         fields=["title"],
+        user_id=user_id,
     )
 
 
-async def sqlite_search_books_by_author(session: AsyncSession, query: str):
+async def sqlite_search_book_ids_by_author(
+    session: AsyncSession,
+    query: str,
+    user_id: int,
+) -> list[int]:
     """Поиск только по автору."""
     search_words = _process_search_query(query)
-    return await _filter_books_by_fields(
+    return await _search_book_ids_by_fields(
         session=session,
         search_words=search_words,
         fields=["author"],
+        user_id=user_id,
     )
 
 
-async def sqlite_search_books_by_description(
+async def sqlite_search_book_ids_by_description(
     session: AsyncSession,
     query: str,
-):
+    user_id: int,
+) -> list[int]:
     """Поиск только по описанию."""
     search_words = _process_search_query(query)
-    return await _filter_books_by_fields(
+    return await _search_book_ids_by_fields(
         session=session,
         search_words=search_words,
         fields=["description"],
-        skip_if_empty=True,  # Пропускаем книги без описания
+        user_id=user_id,
+    )
+
+
+async def sqlite_get_all_book_ids(
+    session: AsyncSession,
+    user_id: int,
+) -> list[int]:
+    """Все книги, доступные пользователю."""
+    return await get_visible_book_ids(
+        ("all",),
+        user_id,
+        lambda: _fetch_book_ids_with_owners(
+            session,
+            _select_book_ids_with_owners(),
+        ),
+    )
+
+
+async def sqlite_get_book_ids_by_uploader_id(
+    session: AsyncSession,
+    uploader_id: int,
+) -> list[int]:
+    result = await session.scalars(
+        select(Book.book_id)
+        .where(Book.uploader_id == uploader_id)
+        .order_by(Book.book_id),
+    )
+    return result.all()
+
+
+async def sqlite_search_pages(
+    session: AsyncSession,
+    query: str,
+    user_id: int,
+    limit: int = PAGES_SEARCH_LIMIT,
+):
+    """
+    Поиск по тексту страниц доступных пользователю книг. Возвращает
+    книгу, номер страницы и фрагмент текста с отмеченными совпадениями,
+    наиболее релевантные страницы идут первыми.
+    """
+    search_words = _process_search_query(query)
+    if not search_words:
+        return []
+
+    # Каждое слово ищем по префиксу, чтобы находить разные словоформы
+    match_query = " ".join(f'"{word}"*' for word in search_words)
+    snippet = func.snippet(
+        text("pages_fts"),
+        0,
+        SNIPPET_MATCH_START,
+        SNIPPET_MATCH_END,
+        "…",
+        SNIPPET_TOKENS,
+    )
+    match_condition = text("pages_fts MATCH :match_query").bindparams(
+        match_query=match_query,
+    )
+    stmt = (
+        select(Book, Page.num, snippet)
+        .select_from(pages_fts)
+        .join(Page, Page.page_id == pages_fts.c.rowid)
+        .join(Book, Book.book_id == Page.book_id)
+    )
+    stmt = stmt.where(match_condition, _visible_to(user_id))
+
+    result = await session.execute(
+        stmt.order_by(text("pages_fts.rank")).limit(limit),
+    )
+    return result.all()
+
+
+async def sqlite_upsert_users(session: AsyncSession, users: list[dict]):
+    """
+    Добавляет пользователей или обновляет их имена одним запросом
+    INSERT ... ON CONFLICT DO UPDATE (без коммита)
+    """
+    stmt = sqlite_insert(User)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                "username": stmt.excluded.username,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+            },
+        ),
+        users,
     )
 
 
@@ -129,7 +378,7 @@ async def sqlite_get_book_with_pages_by_book_id(
     return result.scalars().first()
 
 
-async def sqlite_get_book_with_genres_audio_reviews_by_book_id(
+async def sqlite_get_book_with_genres_audio_by_book_id(
     session: AsyncSession,
     book_id: int,
 ):
@@ -138,12 +387,40 @@ async def sqlite_get_book_with_genres_audio_reviews_by_book_id(
         .options(
             selectinload(Book.genres),
             selectinload(Book.audiobooks),
-            selectinload(Book.reviews),
         )
         .where(Book.book_id == book_id),
     )
 
 
+async def sqlite_update_book_rating(
+    session: AsyncSession,
+    book_id: int,
+    rating_delta: float,
+    count_delta: int,
+) -> Optional[float]:
+    """
+    Изменяет агрегаты оценок книги (без коммита) и возвращает новую
+    среднюю оценку. В genre_index её переносят после коммита.
+    """
+    # Оценки из базы приходят как Decimal, новые - как float
+    rating_delta = round(float(rating_delta), 1)
+    stmt = (
+        update(Book)
+        .where(Book.book_id == book_id)
+        .values(
+            rating_sum=Book.rating_sum + rating_delta,
+            rating_count=Book.rating_count + count_delta,
+        )
+        .returning(Book.rating_sum, Book.rating_count)
+    )
+    # Загруженные в сессию книги не обновляем: агрегаты читаются заново
+    result = await session.execute(
+        stmt.execution_options(synchronize_session=False),
+    )
+    row = result.first()
+    return average_rating(*row) if row else None
+
+
 async def sqlite_get_total_book_pages(session: AsyncSession, book_id: int):
     return await session.scalar(
         select(func.count(Page.page_id)).where(Page.book_id == book_id),
@@ -174,6 +451,21 @@ async def sqlite_get_page_by_book_id_and_page_num(
     )
 
 
+async def sqlite_get_pages_text_by_book_id_and_page_range(
+    session: AsyncSession,
+    book_id: int,
+    first_page: int,
+    last_page: int,
+) -> list[tuple[int, str]]:
+    result = await session.execute(
+        select(Page.num, Page.text).where(
+            Page.book_id == book_id,
+            Page.num.between(first_page, last_page),
+        ),
+    )
+    return result.all()
+
+
 async def sqlite_get_bookmark_or_none(
     session: AsyncSession,
     user_id: int,
@@ -190,19 +482,16 @@ async def sqlite_get_bookmark_or_none(
     return result.scalar_one_or_none()
 
 
-async def sqlite_get_books_by_genre(
+async def sqlite_get_books_by_ids(
     session: AsyncSession,
-    genre_id: int,
+    book_ids: list[int],
 ) -> list[Book]:
-    stmt = (
-        select(Book)
-        .join(Book.genres)
-        .where(Genre.genre_id == genre_id)
-        .options(joinedload(Book.genres))
+    """Возвращает книги в порядке следования их id в списке."""
+    result = await session.execute(
+        select(Book).where(Book.book_id.in_(book_ids)),
     )
-
-    result = await session.execute(stmt)
-    return result.scalars().unique().all()
+    books = {book.book_id: book for book in result.scalars().all()}
+    return [books[book_id] for book_id in book_ids if book_id in books]
 
 
 async def sqlite_get_reviews_with_users_book_by_book_id(
@@ -1,19 +1,24 @@
 __all__ = ()
 
+import asyncio
 import logging
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Tuple
 
 import aiofiles
 from aiogram import Bot
 from aiogram.types import Audio, FSInputFile
 import chardet
+from sqlalchemy import delete, insert
 
 import config_data.config
 from database.db_session import create_session
 from database.models import Book, Page
+from services.page_cache import invalidate_book
 
 PAGE_SIZE = 1050
+PAGES_BATCH_SIZE = 200
+PUNCTUATION_MARKS = frozenset(",.!:;?")
 logger = logging.getLogger(__name__)
 
 
@@ -96,59 +101,87 @@ async def cleanup_book_files(
         logger.error(f"Error deleting cover: {e}")
 
 
-# Функция, проверяющая текст на окончание многоточиями
-def _check_for_ellipsis(text: str, start: int, size: int):
-    punctuation_marks = [",", ".", "!", ":", ";", "?"]
-    stop = start + size
-    punctuation_stop = stop + 1
-    if (
-        text[start:stop][-1] in punctuation_marks
-        and text[start:punctuation_stop][-1] in punctuation_marks
-    ):
-        return False
-
-    return True
-
-
-# Функция, возвращающая строку с текстом страницы и ее размер
-def _get_part_text(text: str, start: int, size: int) -> tuple[str, int]:
-    text += " "
-    punctuation_marks = [",", ".", "!", ":", ";", "?"]
-    while not _check_for_ellipsis(text, start, size):
-        size -= 1
-
-    stop = start + size
-    part_text = text[start:stop] + " "
-    for i in range(1, len(part_text)):
-        if part_text[-i] in punctuation_marks:
-            stop = -i + 1
-            return part_text[:stop], len(part_text[:stop])
-
-    return "", 0
-
+def paginate_text(text: str, size: int = PAGE_SIZE) -> Iterator[slice]:
+    """
+    Генератор границ страниц книги: для каждой страницы возвращает
+    срез с границами её текста. Страница заканчивается на последнем знаке
+    препинания в пределах size символов и не разрывает многоточия.
+    Работает за один проход без копирования текста.
+    """
+    text_length = len(text)
+    # Исходный алгоритм дописывал к тексту пробел,
+    # поэтому индекс text_length считаем пробелом
+    padded_length = text_length + 1
 
-async def prepare_book(book_id: int) -> None:
-    text = await get_book_text(book_id)
+    def is_punctuation_mark(index: int) -> bool:
+        return index < text_length and text[index] in PUNCTUATION_MARKS
 
     start = 0
-    count = 1
-
+    while start < text_length:
+        # Отступаем назад, пока граница страницы разрывает
+        # последовательность знаков препинания (например, многоточие)
+        stop = min(start + size, padded_length)
+        while stop > start and (
+            is_punctuation_mark(stop - 1)
+            and is_punctuation_mark(min(stop + 1, padded_length) - 1)
+        ):
+            stop -= 1
+
+        # Ищем последний знак препинания (первый символ страницы
+        # не учитывается, как и в исходном алгоритме)
+        end = next(
+            (
+                index + 1
+                for index in range(stop - 1, start, -1)
+                if is_punctuation_mark(index)
+            ),
+            None,
+        )
+        if end is None:
+            return
+
+        yield slice(start, end)
+        start = end
+
+
+def split_book_pages(text: str) -> list[str]:
+    """Разбивает текст книги на страницы"""
+    return [text[bounds].strip() for bounds in paginate_text(text)]
+
+
+async def prepare_book(
+    book_id: int,
+    batch_size: int = PAGES_BATCH_SIZE,
+) -> None:
+    text = await get_book_text(book_id)
+    # Разбивка длинной книги занимает заметное время,
+    # поэтому выполняем её вне цикла событий
+    pages = await asyncio.to_thread(split_book_pages, text)
+    # Книга могла загружаться ранее - старые страницы не должны остаться в кэше
+    invalidate_book(book_id)
+
+    # Страницы вставляются пачками, каждая в своей транзакции, чтобы
+    # не держать блокировку записи SQLite на всё время загрузки книги
     session = await create_session()
     try:
-        while start < len(text):
-            page_text, part_size = _get_part_text(text, start, PAGE_SIZE)
-            if page_text:
-                session.add(
-                    Page(book_id=book_id, num=count, text=page_text.strip()),
-                )
-                start += part_size
-                count += 1
-            else:
-                break
-
-        await session.commit()
+        for batch_start in range(0, len(pages), batch_size):
+            await session.execute(
+                insert(Page),
+                [
+                    {"book_id": book_id, "num": num, "text": page_text}
+                    for num, page_text in enumerate(
+                        pages[slice(batch_start, batch_start + batch_size)],
+                        start=batch_start + 1,
+                    )
+                ],
+            )
+            await session.commit()
     except Exception as e:
         await session.rollback()
+        # Удаляем страницы, сохраненные предыдущими пачками
+        await session.execute(delete(Page).where(Page.book_id == book_id))
+        await session.commit()
+        invalidate_book(book_id)
         raise e
     finally:
         await session.close()
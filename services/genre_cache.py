@@ -0,0 +1,65 @@
+__all__ = ()
+
+from dataclasses import dataclass
+from math import ceil
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Genre
+
+# Количество жанров на одной странице клавиатуры
+GENRES_PAGE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class CatalogGenre:
+    genre_id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class GenreCatalog:
+    genres: tuple[CatalogGenre, ...]
+    pages: tuple[tuple[CatalogGenre, ...], ...]  # Жанры по страницам
+
+    @property
+    def pages_count(self) -> int:
+        return len(self.pages)
+
+    def page(self, page_num: int) -> tuple[CatalogGenre, ...]:
+        if not 1 <= page_num <= len(self.pages):
+            return ()
+
+        return self.pages[page_num - 1]
+
+
+# Жанры меняются только при инициализации базы, поэтому список
+# загружается один раз и заменяется целиком при обновлении
+_catalog: GenreCatalog | None = None
+
+
+async def load_genre_catalog(session: AsyncSession) -> GenreCatalog:
+    """Загружает жанры из базы данных и обновляет каталог"""
+    global _catalog
+
+    result = await session.execute(
+        select(Genre.genre_id, Genre.name).order_by(Genre.genre_id),
+    )
+    genres = tuple(CatalogGenre(genre_id, name) for genre_id, name in result)
+    catalog = GenreCatalog(
+        genres=genres,
+        pages=tuple(
+            genres[slice(i * GENRES_PAGE_SIZE, (i + 1) * GENRES_PAGE_SIZE)]
+            for i in range(ceil(len(genres) / GENRES_PAGE_SIZE))
+        ),
+    )
+    _catalog = catalog
+    return catalog
+
+
+async def get_genre_catalog(session: AsyncSession) -> GenreCatalog:
+    if _catalog is None:
+        return await load_genre_catalog(session)
+
+    return _catalog
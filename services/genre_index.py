@@ -0,0 +1,191 @@
+__all__ = ()
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Book, book_genre
+
+# Максимальная оценка книги (звезд)
+MAX_RATING = 5
+
+# Номера установленных битов для каждого значения байта
+_BYTE_BITS = tuple(
+    tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)
+)
+
+
+def _bitmap_to_ids(bitmap: int) -> list[int]:
+    """Возвращает id книг, биты которых установлены, по возрастанию"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    return [
+        index * 8 + bit
+        for index, byte in enumerate(data)
+        if byte
+        for bit in _BYTE_BITS[byte]
+    ]
+
+
+def average_rating(rating_sum, rating_count: int) -> float:
+    if not rating_count:
+        return 0.0
+
+    return round(float(rating_sum) / rating_count, 1)
+
+
+class GenreIndex:
+    """
+    Битовые карты книг в памяти: бит с номером book_id установлен, если
+    книга входит в множество. Хранятся карты жанров, публичных книг,
+    приватных книг каждого пользователя и книг с оценкой не ниже N звезд,
+    поэтому пересечения и подсчеты сводятся к операциям над int.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._genres: dict[int, int] = {}
+        self._public = 0
+        self._private: dict[int, int] = {}
+        # Индекс списка - минимальная оценка книги
+        self._rating_at_least = [0] * (MAX_RATING + 1)
+
+    async def load(self, session: AsyncSession):
+        """Строит битовые карты по таблицам books и book_genre"""
+        genres: dict[int, int] = {}
+        public = 0
+        private: dict[int, int] = {}
+        rating_at_least = [0] * (MAX_RATING + 1)
+
+        books = await session.execute(
+            select(
+                Book.book_id,
+                Book.is_public,
+                Book.uploader_id,
+                Book.rating_sum,
+                Book.rating_count,
+            ),
+        )
+        for book_id, is_public, uploader_id, rating_sum, rating_count in books:
+            bit = 1 << book_id
+            if is_public:
+                public |= bit
+            else:
+                private[uploader_id] = private.get(uploader_id, 0) | bit
+
+            rating = average_rating(rating_sum, rating_count)
+            for min_rating in range(1, int(rating) + 1):
+                rating_at_least[min_rating] |= bit
+
+        links = await session.execute(
+            select(book_genre.c.book_id, book_genre.c.genre_id),
+        )
+        for book_id, genre_id in links:
+            genres[genre_id] = genres.get(genre_id, 0) | 1 << book_id
+
+        self._genres = genres
+        self._public = public
+        self._private = private
+        self._rating_at_least = rating_at_least
+        self.loaded = True
+
+    def add_book(
+        self,
+        book_id: int,
+        genre_ids: list[int],
+        is_public: bool,
+        uploader_id: int,
+    ):
+        if not self.loaded:
+            return
+
+        bit = 1 << book_id
+        for genre_id in genre_ids:
+            self._genres[genre_id] = self._genres.get(genre_id, 0) | bit
+
+        if is_public:
+            self._public |= bit
+        else:
+            self._private[uploader_id] = (
+                self._private.get(uploader_id, 0) | bit
+            )
+
+    def remove_book(self, book_id: int):
+        if not self.loaded:
+            return
+
+        mask = ~(1 << book_id)
+        for genre_id in self._genres:
+            self._genres[genre_id] &= mask
+
+        for uploader_id in self._private:
+            self._private[uploader_id] &= mask
+
+        self._public &= mask
+        self.set_rating(book_id, 0.0)
+
+    def set_rating(self, book_id: int, rating: float):
+        if not self.loaded:
+            return
+
+        bit = 1 << book_id
+        for min_rating in range(1, MAX_RATING + 1):
+            if rating >= min_rating:
+                self._rating_at_least[min_rating] |= bit
+            else:
+                self._rating_at_least[min_rating] &= ~bit
+
+    def candidates(self, user_id: int, min_rating: int = 0) -> int:
+        """Книги, доступные пользователю, с оценкой не ниже min_rating"""
+        bitmap = self._public | self._private.get(user_id, 0)
+        if min_rating > 0:
+            bitmap &= self._rating_at_least[min(min_rating, MAX_RATING)]
+
+        return bitmap
+
+    def search(
+        self,
+        genre_ids: list[int],
+        match_all: bool,
+        user_id: int,
+        min_rating: int = 0,
+    ) -> list[int]:
+        """
+        Книги, входящие во все (match_all) или хотя бы в один из жанров,
+        с учетом видимости и минимальной оценки.
+        """
+        if not genre_ids:
+            return []
+
+        genre_bitmaps = [
+            self._genres.get(genre_id, 0) for genre_id in genre_ids
+        ]
+        bitmap = genre_bitmaps[0]
+        for genre_bitmap in genre_bitmaps[1:]:
+            if match_all:
+                bitmap &= genre_bitmap
+            else:
+                bitmap |= genre_bitmap
+
+        return _bitmap_to_ids(bitmap & self.candidates(user_id, min_rating))
+
+    def facet_counts(
+        self,
+        genre_ids: list[int],
+        user_id: int,
+        min_rating: int = 0,
+    ) -> dict[int, int]:
+        """Число доступных пользователю книг каждого из жанров"""
+        candidates = self.candidates(user_id, min_rating)
+        return {
+            genre_id: (self._genres.get(genre_id, 0) & candidates).bit_count()
+            for genre_id in genre_ids
+        }
+
+
+genre_index = GenreIndex()
+
+
+async def get_genre_index(session: AsyncSession) -> GenreIndex:
+    if not genre_index.loaded:
+        await genre_index.load(session)
+
+    return genre_index
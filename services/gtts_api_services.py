@@ -1,17 +1,19 @@
 __all__ = ()
 
 import asyncio
+from collections import deque
 import logging
 from pathlib import Path
+from typing import Awaitable, Callable, Optional
 
 import aiofiles
-from aiogram import Bot
 from gtts import gTTS, gTTSError
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Audiobook, Book
-from lexicon import LEXICON
+from services.rate_limiter import tts_limiter
+from services.tts_cache import chunk_key, get_cached_segment, store_segment
+
+# Язык озвучивания аудиокниг
+TTS_LANGUAGE = "ru"
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,18 @@ async def async_tts_save(text: str, lang: str, path: Path):
     loop = asyncio.get_running_loop()
     try:
         tts = gTTS(text=text, lang=lang)
+        # Все задачи озвучивания получают разрешение у общего ограничителя
+        await tts_limiter.acquire()
         await loop.run_in_executor(
             None,
             lambda: tts.save(str(path)),  # Используем стандартный ThreadPool
         )
+        tts_limiter.reward()
         return True
     except gTTSError as e:
         if "429" in str(e):
             logger.warning(f"TTS API rate limit exceeded: {e}")
+            tts_limiter.penalize()
         else:
             logger.exception(f"TTS API error: {e}")
 
@@ -38,181 +44,123 @@ async def async_tts_save(text: str, lang: str, path: Path):
         return False
 
 
-async def generate_and_save_audiobook(
-    bot: Bot,
-    session: AsyncSession,
-    book: Book,
-    user_id: int,
-    chat_id: int,
-    book_text: str,
-    chunk_size: int = 500,
-    delay: float = 1.0,
-    max_retries: int = 3,
-):
-    """Асинхронная генерация аудиокниги с обработкой ограничений API"""
-    audiobook = None
-    base_dir = Path("media/audiobooks")
-    output_path = None
-    main_file = None
-
-    try:
-        if len(book_text) >= 100_000:
-            await bot.send_message(
-                chat_id,
-                LEXICON["gtts_text_too_long"],
+async def synthesize_chunk(
+    chunk: str,
+    path: Path,
+    delay: float,
+    max_retries: int,
+) -> Optional[Path]:
+    """
+    Озвучивает фрагмент, повторяя запрос с нарастающей паузой. Фрагменты,
+    озвученные раньше, берутся из кэша. Возвращает путь к mp3 фрагмента
+    или None, если озвучить его не удалось
+    """
+    key = chunk_key(chunk, TTS_LANGUAGE)
+    segment = get_cached_segment(key)
+    if segment:
+        return segment
+
+    retry_count = 0
+    while retry_count < max_retries:
+        try:
+            if await async_tts_save(chunk, TTS_LANGUAGE, path):
+                segment = _store_in_cache(key, path)
+                # Пауза между запросами одного потока
+                await asyncio.sleep(delay)
+                return segment
+
+            retry_count += 1
+            wait_time = delay * (2**retry_count)
+            logger.warning(
+                f"Retry {retry_count}/{max_retries}, "
+                f"waiting {wait_time}s...",
             )
-            return None
+            await asyncio.sleep(wait_time)
 
-        await bot.send_message(
-            chat_id,
-            LEXICON["gtts_start_generating"].format(book_title=book.title),
-        )
-        # Создаем запись аудиокниги в БД
-        audiobook = Audiobook(
-            book_id=book.book_id,
-            title=LEXICON["generated_audiobook_title"].format(
-                book_title=book.title,
-            ),
-            uploader_id=user_id,
+        except Exception as e:
+            logger.exception(f"Error processing chunk {path.name}: {e}")
+            retry_count += 1
+            await asyncio.sleep(delay * 2)
+
+    return None
+
+
+def _store_in_cache(key: str, path: Path) -> Path:
+    try:
+        return store_segment(key, path)
+    except OSError as e:
+        # Без кэша фрагмент все равно можно использовать
+        logger.exception(f"Error caching TTS segment {path.name}: {e}")
+        return path
+
+
+async def synthesize_to_file(
+    chunks: list[str],
+    main_file,
+    temp_path: Callable[[int], Path],
+    concurrency: int,
+    delay: float,
+    max_retries: int,
+    on_chunk_written: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> bool:
+    """
+    Озвучивает фрагменты, держа в работе до concurrency запросов, и
+    дописывает результаты в main_file в исходном порядке. Возвращает False,
+    если фрагмент не удалось озвучить. Запросы делаются только для
+    фрагментов, которых нет в кэше. При ошибке или отмене незавершенные
+    запросы отменяются, а их временные файлы удаляются.
+    on_chunk_written вызывается с числом уже записанных фрагментов.
+    """
+    chunks_iter = enumerate(chunks)
+    # Запущенные запросы в порядке фрагментов: (номер, путь, задача)
+    pending: deque[tuple[int, Path, asyncio.Task]] = deque()
+
+    def schedule_next():
+        item = next(chunks_iter, None)
+        if item is None:
+            return
+
+        index, chunk = item
+        path = temp_path(index)
+        task = asyncio.create_task(
+            synthesize_chunk(chunk, path, delay, max_retries),
         )
-        session.add(audiobook)
-        await session.flush()
-        await session.refresh(audiobook)
-
-        # Подготовка путей
-        base_dir.mkdir(parents=True, exist_ok=True)
-        output_path = base_dir / f"{audiobook.audiobook_id}.mp3"
-        temp_files = []
-
-        # Явно открываем файл в режиме записи
-        main_file = await aiofiles.open(output_path, "wb")
-
-        chunks = [
-            book_text[slice(i, i + chunk_size)]
-            for i in range(0, len(book_text), chunk_size)
-        ]
-
-        for i, chunk in enumerate(chunks):
-            temp_path = base_dir / f"temp_{audiobook.audiobook_id}_{i}.mp3"
-            temp_files.append(temp_path)
-            retry_count = 0
-            success = False
-
-            while retry_count < max_retries and not success:
-                try:
-                    success = await async_tts_save(chunk, "ru", temp_path)
-
-                    if not success:
-                        retry_count += 1
-                        wait_time = delay * (2**retry_count)
-                        logger.warning(
-                            f"Retry {retry_count}/{max_retries}, "
-                            f"waiting {wait_time}s...",
-                        )
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    async with aiofiles.open(temp_path, "rb") as temp_file:
-                        await main_file.write(await temp_file.read())
-
-                except Exception as e:
-                    logger.exception(f"Error processing chunk {i}: {e}")
-                    retry_count += 1
-                    await asyncio.sleep(delay * 2)
-                    continue
-
-            if not success:
+        pending.append((index, path, task))
+
+    for _ in range(max(concurrency, 1)):
+        schedule_next()
+
+    try:
+        while pending:
+            index, path, task = pending[0]
+            segment = await task
+            pending.popleft()
+            if segment is None:
                 logger.error(
-                    f"Failed to process chunk {i} after {max_retries} retries",
-                )
-                # Закрываем основной файл перед удалением
-                if main_file:
-                    await main_file.close()
-                # Удаляем все временные файлы
-                for file in temp_files:
-                    try:
-                        file.unlink(missing_ok=True)
-                    except Exception as e:
-                        logger.exception(
-                            f"Error deleting temp file {file}: {e}",
-                        )
-                # Удаляем выходной файл, если он был частично создан
-                if output_path.exists():
-                    try:
-                        output_path.unlink()
-                    except Exception as e:
-                        logger.exception(f"Error deleting output file: {e}")
-                # Откатываем БД
-                await session.rollback()
-                # Уведомляем пользователя
-                await bot.send_message(
-                    chat_id,
-                    LEXICON["gtts_api_failure"],
+                    f"Failed to process chunk {index} "
+                    f"after {max_retries} retries",
                 )
-                return None
-
-            try:
-                temp_path.unlink(missing_ok=True)
-            except Exception as e:
-                logger.exception(f"Error deleting temp file: {e}")
-
-            await asyncio.sleep(delay)
-
-        # Закрываем основной файл перед сохранением в БД
-        if main_file:
-            await main_file.close()
-
-        # Сохранение пути к файлу
-        audiobook.audio_url = str(output_path)
-        session.add(audiobook)
-        await session.commit()
-
-        # Проверка, что книга еще существует
-        if not await session.scalar(
-            select(Book).where(Book.book_id == book.book_id),
-        ):
-            output_path.unlink(missing_ok=True)
-            return None
-
-        # Уведомление пользователю
-        await bot.send_message(
-            chat_id,
-            LEXICON["audiobook_generated"].format(book_title=book.title),
-        )
-        return output_path
+                return False
 
-    except Exception as e:
-        logger.exception(f"Audiobook generation failed: {e}")
-        # Закрываем основной файл, если он был открыт
-        if main_file:
-            await main_file.close()
-        # Удаляем созданные файлы
-        if output_path and output_path.exists():
-            try:
-                output_path.unlink()
-            except Exception as e:
-                logger.exception(f"Error deleting output file: {e}")
-        # Удаляем временные файлы
-        for file in base_dir.glob(
-            (
-                f"temp_{audiobook.audiobook_id}_*.mp3"
-                if audiobook
-                else "temp_*.mp3"
-            ),
-        ):
-            try:
-                file.unlink()
-            except Exception as e:
-                logger.exception(f"Error deleting temp file {file}: {e}")
-        # Откатываем БД
-        await session.rollback()
-        # Уведомляем пользователя
-        try:
-            await bot.send_message(
-                chat_id,
-                LEXICON["gtts_api_failure"],
-            )
-        except Exception:
-            logger.exception("Failed to send error notification to user")
+            # Освободившееся место сразу занимает следующий фрагмент
+            schedule_next()
+            async with aiofiles.open(segment, "rb") as segment_file:
+                await main_file.write(await segment_file.read())
 
-        return None
+            # Временный файл остается, только если его не удалось закэшировать
+            path.unlink(missing_ok=True)
+            if on_chunk_written:
+                await on_chunk_written(index + 1)
+
+        return True
+
+    finally:
+        for _, _, task in pending:
+            task.cancel()
+
+        await asyncio.gather(
+            *(task for _, _, task in pending),
+            return_exceptions=True,
+        )
+        for _, path, _ in pending:
+            path.unlink(missing_ok=True)
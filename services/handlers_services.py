@@ -1,18 +1,23 @@
 __all__ = ()
 
+import asyncio
+import logging
+from pathlib import Path
 from typing import Union
 
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, FSInputFile, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Book
+from database.models import Audiobook, Book
 from keyboards.book_pagination_kb import create_book_pagination_keyboard
 from lexicon import LEXICON
-from services.database_services import (
-    sqlite_get_bookmark_or_none,
-    sqlite_get_page_by_book_id_and_page_num,
-)
+from services.database_services import sqlite_get_bookmark_or_none
+from services.file_handling import load_cover
+from services.page_cache import get_page_text, prefetch_pages
+
+logger = logging.getLogger(__name__)
 
 
 async def show_page(
@@ -37,16 +42,14 @@ async def show_page(
         return None
 
     # Получаем данные страницы
-    book_id = current_book_dict["book"].book_id
-    page = await sqlite_get_page_by_book_id_and_page_num(
-        session,
-        book_id,
-        page_num,
-    )
-    if not page:
+    book_id = current_book_dict["book_id"]
+    page_text = await get_page_text(session, book_id, page_num)
+    if not page_text:
         await event.answer(LEXICON["page_not_found"])
         return None
 
+    prefetch_pages(book_id, page_num)
+
     # Создаем клавиатуру
     bookmark = await sqlite_get_bookmark_or_none(
         session,
@@ -58,9 +61,9 @@ async def show_page(
 
     # Отправляем сообщение
     if isinstance(event, CallbackQuery):
-        msg = await event.message.answer(page.text, reply_markup=keyboard)
+        msg = await event.message.answer(page_text, reply_markup=keyboard)
     else:
-        msg = await event.answer(page.text, reply_markup=keyboard)
+        msg = await event.answer(page_text, reply_markup=keyboard)
 
     # Обновляем состояние
     await state.update_data(
@@ -71,17 +74,68 @@ async def show_page(
     return msg
 
 
-async def filter_public_book(book: Book, user_id: int) -> bool:
-    if not book.is_public and book.uploader_id != user_id:
-        return False
-
-    return True
-
+async def answer_book_cover(
+    message: Message,
+    book: Book,
+    **kwargs,
+) -> Message | None:
+    """
+    Отправляет обложку книги по сохраненному file_id Telegram, а если его
+    нет или Telegram его отклонил - загружает файл с диска и запоминает
+    новый file_id. Возвращает None, если обложки нет.
+    """
+    if book.cover_file_id:
+        try:
+            return await message.answer_photo(
+                photo=book.cover_file_id,
+                **kwargs,
+            )
+        except TelegramBadRequest as e:
+            logger.warning(f"Cover file_id of book {book.book_id} failed: {e}")
+
+    cover_file = await load_cover(book.book_id)
+    if not cover_file:
+        return None
 
-async def filter_public_books(books: list[Book], user_id: int) -> list[Book]:
-    filtered_books = []
-    for book in books:
-        if await filter_public_book(book, user_id):
-            filtered_books.append(book)
+    sent_message = await message.answer_photo(photo=cover_file, **kwargs)
+    book.cover_file_id = sent_message.photo[-1].file_id
+    return sent_message
+
+
+async def answer_audiobook(
+    message: Message,
+    audiobook: Audiobook,
+) -> Message | None:
+    """
+    Отправляет аудиокнигу по сохраненному file_id Telegram, а если его
+    нет или Telegram его отклонил - загружает файл с диска и запоминает
+    новый file_id. Возвращает None, если файл недоступен.
+    """
+    audio_kwargs = {
+        "title": f"{audiobook.book.title} | {audiobook.title}",
+        "performer": audiobook.book.author,
+    }
+    if audiobook.telegram_file_id:
+        try:
+            return await message.answer_audio(
+                audio=audiobook.telegram_file_id,
+                **audio_kwargs,
+            )
+        except TelegramBadRequest as e:
+            logger.warning(
+                f"Audio file_id of audiobook {audiobook.audiobook_id} "
+                f"failed: {e}",
+            )
+
+    # Проверяем существование файла
+    audio_path = Path(audiobook.audio_url)
+    if not await asyncio.to_thread(audio_path.exists):
+        return None
 
-    return filtered_books
+    await message.answer(LEXICON["wait_for_listen_audio"])
+    sent_message = await message.answer_audio(
+        audio=FSInputFile(audio_path),
+        **audio_kwargs,
+    )
+    audiobook.telegram_file_id = sent_message.audio.file_id
+    return sent_message
@@ -0,0 +1,103 @@
+__all__ = ()
+
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_session import create_session
+from services.cache import LRUCache
+from services.database_services import (
+    sqlite_get_page_by_book_id_and_page_num,
+    sqlite_get_pages_text_by_book_id_and_page_range,
+)
+
+# Объем кэша в символах текста страниц (страница - около 1050 символов)
+PAGE_CACHE_MAX_SIZE = 16 * 1024 * 1024
+# Сколько следующих страниц подгружать заранее при листании
+PREFETCH_PAGES = 3
+
+logger = logging.getLogger(__name__)
+
+# Общий для всех пользователей кэш текстов страниц: (book_id, num) -> text
+page_cache = LRUCache(PAGE_CACHE_MAX_SIZE, sizeof=len)
+
+# Поколение кэша: предзагрузка, начатая до сброса кэша книги,
+# не должна вернуть в кэш устаревшие страницы. Счетчик общий для всех
+# книг - книги меняются редко, а лишняя отброшенная предзагрузка дешева
+_generation = 0
+_prefetch_tasks: dict[tuple[int, int], asyncio.Task] = {}
+
+
+async def get_page_text(
+    session: AsyncSession,
+    book_id: int,
+    page_num: int,
+) -> str | None:
+    """Возвращает текст страницы из кэша или из базы данных"""
+    text = page_cache.get((book_id, page_num))
+    if text is not None:
+        return text
+
+    page = await sqlite_get_page_by_book_id_and_page_num(
+        session,
+        book_id,
+        page_num,
+    )
+    if not page:
+        return None
+
+    page_cache.set((book_id, page_num), page.text)
+    return page.text
+
+
+def prefetch_pages(book_id: int, page_num: int, count: int = PREFETCH_PAGES):
+    """Фоново подгружает в кэш страницы, следующие за page_num"""
+    missing_pages = [
+        num
+        for num in range(page_num + 1, page_num + count + 1)
+        if (book_id, num) not in page_cache
+    ]
+    if not missing_pages:
+        return
+
+    task_key = (book_id, missing_pages[0])
+    if task_key in _prefetch_tasks:
+        return
+
+    task = asyncio.create_task(
+        _load_pages(book_id, missing_pages[0], missing_pages[-1]),
+    )
+    _prefetch_tasks[task_key] = task
+    task.add_done_callback(lambda _: _prefetch_tasks.pop(task_key, None))
+
+
+def invalidate_book(book_id: int):
+    """Удаляет из кэша страницы книги (при удалении или перезагрузке)"""
+    global _generation
+
+    _generation += 1
+    page_cache.pop_where(lambda key: key[0] == book_id)
+
+
+async def _load_pages(book_id: int, first_page: int, last_page: int):
+    generation = _generation
+    session = await create_session()
+    try:
+        pages = await sqlite_get_pages_text_by_book_id_and_page_range(
+            session,
+            book_id,
+            first_page,
+            last_page,
+        )
+    except Exception as e:
+        logger.exception(f"Error prefetching pages: {e}")
+        return
+    finally:
+        await session.close()
+
+    if generation != _generation:
+        return
+
+    for num, text in pages:
+        page_cache.set((book_id, num), text)
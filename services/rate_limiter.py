@@ -0,0 +1,114 @@
+__all__ = ()
+
+import asyncio
+import logging
+import time
+
+from config_data.config import config
+
+logger = logging.getLogger(__name__)
+
+# Во сколько раз снижается скорость после ответа 429
+PENALTY_FACTOR = 0.5
+# Пауза в секундах для всех запросов после ответа 429
+PENALTY_COOLDOWN = 5.0
+# Доля исходной скорости, ниже которой скорость не снижается
+MIN_RATE_FRACTION = 0.05
+# Доля исходной скорости, возвращаемая после каждого успешного запроса
+RECOVERY_FRACTION = 0.02
+
+
+class TokenBucketLimiter:
+    """
+    Общий для процесса ограничитель частоты запросов («ведро токенов»):
+    токены копятся со скоростью rate в секунду, но не больше burst, и
+    каждый запрос забирает один токен. После ответа 429 скорость
+    снижается для всех сразу, а успешные запросы постепенно её
+    восстанавливают (AIMD).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+        self._acquired = 0
+        self._penalties = 0
+
+    async def acquire(self):
+        """Ждет свободный токен. Очередь ожидающих обслуживается по порядку"""
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._blocked_until:
+                        await asyncio.sleep(self._blocked_until - now)
+                        continue
+
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._acquired += 1
+                        return
+
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self._waiting -= 1
+
+    def penalize(self):
+        """Сообщает об ответе 429: замедляет всех и делает общую паузу"""
+        now = time.monotonic()
+        # Ответы 429 на запросы, отправленные до паузы, относятся к тому же
+        # превышению лимита: скорость снижается один раз
+        if now < self._blocked_until:
+            return
+
+        self._refill(now)
+        self.rate = max(
+            self.rate * PENALTY_FACTOR,
+            self.max_rate * MIN_RATE_FRACTION,
+        )
+        self._tokens = 0.0
+        self._blocked_until = max(self._blocked_until, now + PENALTY_COOLDOWN)
+        self._penalties += 1
+        logger.warning(f"Rate limit hit, slowing down to {self.rate:.2f}/s")
+
+    def reward(self):
+        """Сообщает об успешном запросе: понемногу возвращает скорость"""
+        if self.rate < self.max_rate:
+            self._refill(time.monotonic())
+            self.rate = min(
+                self.rate + self.max_rate * RECOVERY_FRACTION,
+                self.max_rate,
+            )
+
+    @property
+    def state(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "tokens": self._tokens,
+            "burst": self.burst,
+            "waiting": self._waiting,
+            "acquired": self._acquired,
+            "penalties": self._penalties,
+            "cooldown": max(self._blocked_until - now, 0.0),
+        }
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self._tokens + (now - self._updated_at) * self.rate,
+            self.burst,
+        )
+        self._updated_at = now
+
+
+# Единый ограничитель для всех задач озвучивания
+tts_limiter = TokenBucketLimiter(config.tts.rate, config.tts.burst)
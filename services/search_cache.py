@@ -0,0 +1,58 @@
+__all__ = ()
+
+from typing import Awaitable, Callable, Hashable
+
+from services.cache import LRUCache
+
+# Объем кэша в id книг по всем сохраненным результатам поиска
+# (плюс одна единица на каждый запрос)
+SEARCH_CACHE_MAX_SIZE = 200_000
+# Время жизни результата поиска в секундах
+SEARCH_CACHE_TTL = 600
+
+# Общий для всех пользователей кэш результатов поиска:
+# (режим поиска, нормализованный запрос) -> ((book_id, owner_id), ...),
+# где owner_id - загрузивший книгу пользователь для приватных книг
+# и None для публичных
+search_cache = LRUCache(
+    SEARCH_CACHE_MAX_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    # Пустой результат тоже занимает место, иначе запросы
+    # без результатов не ограничены объемом кэша
+    sizeof=lambda entries: len(entries) + 1,
+)
+
+# Поколение кэша: результат поиска, начатого до сброса кэша,
+# не должен в него попасть
+_generation = 0
+
+
+async def get_visible_book_ids(
+    key: Hashable,
+    user_id: int,
+    load: Callable[[], Awaitable[tuple]],
+) -> list[int]:
+    """
+    Возвращает id найденных книг, доступных пользователю. При промахе
+    результат поиска загружается функцией load и сохраняется в кэш.
+    """
+    entries = search_cache.get(key)
+    if entries is None:
+        generation = _generation
+        entries = await load()
+        if generation == _generation:
+            search_cache.set(key, entries)
+
+    return [
+        book_id
+        for book_id, owner_id in entries
+        if owner_id is None or owner_id == user_id
+    ]
+
+
+def invalidate_search_cache():
+    """Сбрасывает кэш при добавлении или удалении книг"""
+    global _generation
+
+    _generation += 1
+    search_cache.clear()
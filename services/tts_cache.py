@@ -0,0 +1,90 @@
+__all__ = ()
+
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import gtts
+
+import config_data.config
+from services.cache import LRUCache
+
+TTS_CACHE_DIR = config_data.config.BASE_DIR / "media" / "tts_cache"
+# Объем кэша озвученных фрагментов в байтах
+TTS_CACHE_MAX_SIZE = 512 * 1024 * 1024
+# Движок входит в ключ: после обновления gTTS фрагменты озвучиваются заново
+TTS_ENGINE = f"gtts-{gtts.__version__}"
+
+logger = logging.getLogger(__name__)
+
+
+def _segment_path(key: str) -> Path:
+    return TTS_CACHE_DIR / key[:2] / f"{key}.mp3"
+
+
+def _remove_segment(key: str, _size: int):
+    _segment_path(key).unlink(missing_ok=True)
+
+
+# Кэш mp3-фрагментов на диске: хэш фрагмента -> размер файла
+tts_cache = LRUCache(TTS_CACHE_MAX_SIZE, sizeof=int, on_evict=_remove_segment)
+
+
+def chunk_key(text: str, lang: str) -> str:
+    """Ключ фрагмента: хэш от движка, языка и нормализованного текста"""
+    data = "\0".join((TTS_ENGINE, lang, text)).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def _scan_segments() -> list[tuple[float, str, int]]:
+    """Фрагменты на диске, от давно использованных к недавним"""
+    segments = []
+    for path in TTS_CACHE_DIR.glob("*/*.mp3"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+
+        segments.append((stat.st_mtime, path.stem, stat.st_size))
+
+    return sorted(segments)
+
+
+async def load_tts_cache():
+    """
+    Заполняет кэш файлами, сохраненными до перезапуска. Время изменения
+    файла обновляется при каждом попадании, поэтому порядок LRU сохраняется.
+    Обход каталога выполняется вне цикла событий
+    """
+    segments = await asyncio.to_thread(_scan_segments)
+    for _, key, size in segments:
+        tts_cache.set(key, size)
+
+    logger.info(f"TTS cache loaded: {len(tts_cache)} segments")
+
+
+def get_cached_segment(key: str) -> Optional[Path]:
+    """Путь к озвученному фрагменту или None, если его нет в кэше"""
+    if tts_cache.get(key) is None:
+        return None
+
+    path = _segment_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        tts_cache.pop(key)
+        return None
+
+    return path
+
+
+def store_segment(key: str, source: Path) -> Path:
+    """Переносит озвученный фрагмент в кэш и возвращает его новый путь"""
+    path = _segment_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    source.replace(path)
+    tts_cache.set(key, path.stat().st_size)
+    return path
@@ -0,0 +1,88 @@
+__all__ = ()
+
+import re
+
+from gtts import gTTS
+from gtts.tokenizer import symbols
+
+# Максимальная длина текста, который gTTS отправляет одним запросом
+TTS_REQUEST_MAX_CHARS = gTTS.GOOGLE_TTS_MAX_CHARS
+
+# Перенос слова по дефису на конце строки
+_LINE_BREAK_HYPHEN_RE = re.compile(r"(\w)-\n(\w)")
+# Все, кроме букв, цифр, пробелов и произносимой пунктуации
+_UNSPEAKABLE_RE = re.compile(r"[^\w\s.,!?;:…()«»\"'%№+=—–-]|_")
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w")
+
+# Границы, по которым делится слишком длинный текст, от крупных к мелким:
+# конец предложения, конец части предложения, пробел между словами
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END_RE = re.compile(r"(?<=[,;:)»])\s+|\s+(?=[—–(«])")
+_SPLITTERS = (_SENTENCE_END_RE, _CLAUSE_END_RE, _WHITESPACE_RE)
+
+
+def normalize_tts_text(text: str) -> str:
+    """Склеивает переносы, убирает непроизносимые символы и лишние пробелы"""
+    text = _LINE_BREAK_HYPHEN_RE.sub(r"\1\2", text)
+    text = _UNSPEAKABLE_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _request_length(text: str) -> int:
+    """
+    Длина текста после предобработки gTTS: после каждого знака,
+    меняющего интонацию, он добавляет пробел
+    """
+    return len(text) + sum(text.count(mark) for mark in symbols.TONE_MARKS)
+
+
+def _pieces(text: str, max_chars: int, level: int = 0):
+    """Делит текст по самым крупным границам, при которых части влезают"""
+    if _request_length(text) <= max_chars:
+        yield text
+        return
+
+    if level == len(_SPLITTERS):
+        # Слово длиннее запроса (например, ссылка) режем по символам
+        step = max_chars // 2
+        for start in range(0, len(text), step):
+            yield text[slice(start, start + step)]
+
+        return
+
+    for part in _SPLITTERS[level].split(text):
+        if part:
+            yield from _pieces(part, max_chars, level + 1)
+
+
+def split_for_tts(
+    text: str,
+    max_chars: int = TTS_REQUEST_MAX_CHARS,
+) -> list[str]:
+    """
+    Делит текст на фрагменты, каждый из которых gTTS озвучит одним
+    запросом. Фрагменты набираются из целых предложений, а длинные
+    предложения делятся по частям предложения и между словами.
+    """
+    chunks = []
+    current = ""
+    for piece in _pieces(normalize_tts_text(text), max_chars):
+        # Одну пунктуацию gTTS озвучить не может («No text to send»)
+        if not _WORD_RE.search(piece):
+            continue
+
+        candidate = f"{current} {piece}" if current else piece
+        if _request_length(candidate) <= max_chars:
+            current = candidate
+            continue
+
+        if current:
+            chunks.append(current)
+
+        current = piece
+
+    if current:
+        chunks.append(current)
+
+    return chunks
@@ -0,0 +1,371 @@
+__all__ = ()
+
+import asyncio
+from datetime import datetime
+import logging
+from pathlib import Path
+import time
+
+import aiofiles
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config_data.config import config
+from database.db_session import create_session
+from database.models import Audiobook, Book, TTSJob
+from lexicon import LEXICON
+from services.file_handling import get_book_text
+from services.gtts_api_services import synthesize_to_file
+from services.tts_chunker import split_for_tts
+
+AUDIOBOOKS_DIR = Path("media/audiobooks")
+# Книги длиннее этого числа символов не озвучиваются
+TTS_MAX_TEXT_LENGTH = 100_000
+# Шаг в процентах, с которым обновляется сообщение о прогрессе
+PROGRESS_STEP = 5
+# Контрольная точка сохраняется раз в столько фрагментов или секунд.
+# После перезапуска несохраненные фрагменты берутся из кэша озвучивания
+CHECKPOINT_CHUNKS = 20
+CHECKPOINT_INTERVAL = 10.0
+# Пауза и число попыток при ошибках запросов к TTS
+TTS_DELAY = 1.0
+TTS_MAX_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+# Выполняющиеся задачи: job_id -> asyncio.Task
+_job_tasks: dict[int, asyncio.Task] = {}
+
+
+def _output_path(audiobook_id: int) -> Path:
+    return AUDIOBOOKS_DIR / f"{audiobook_id}.mp3"
+
+
+def _temp_path(audiobook_id: int, index: int) -> Path:
+    return AUDIOBOOKS_DIR / f"temp_{audiobook_id}_{index}.mp3"
+
+
+def _remove_job_files(audiobook_id: int):
+    for file in (
+        _output_path(audiobook_id),
+        *AUDIOBOOKS_DIR.glob(f"temp_{audiobook_id}_*.mp3"),
+    ):
+        try:
+            file.unlink(missing_ok=True)
+        except Exception as e:
+            logger.exception(f"Error deleting file {file}: {e}")
+
+
+async def start_audiobook_job(
+    bot: Bot,
+    book_id: int,
+    user_id: int,
+    chat_id: int,
+):
+    """Сохраняет задачу генерации аудиокниги в базе и запускает её"""
+    session = await create_session()
+    try:
+        job = TTSJob(book_id=book_id, user_id=user_id, chat_id=chat_id)
+        session.add(job)
+        await session.commit()
+        job_id = job.job_id
+    finally:
+        await session.close()
+
+    _spawn(bot, job_id)
+
+
+async def resume_audiobook_jobs(bot: Bot):
+    """Продолжает задачи, прерванные перезапуском бота"""
+    session = await create_session()
+    try:
+        stmt = (
+            select(TTSJob.job_id)
+            .where(TTSJob.status.in_(("pending", "running")))
+            .order_by(TTSJob.job_id)
+        )
+        job_ids = (await session.scalars(stmt)).all()
+    finally:
+        await session.close()
+
+    for job_id in job_ids:
+        _spawn(bot, job_id)
+
+    if job_ids:
+        logger.info(f"Resumed {len(job_ids)} audiobook generation jobs")
+
+
+async def stop_audiobook_jobs():
+    """
+    Останавливает задачи при выключении бота. Контрольные точки остаются
+    в базе, и после запуска задачи продолжатся с них
+    """
+    tasks = list(_job_tasks.values())
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def delete_audiobook_jobs(session: AsyncSession, book_id: int):
+    """
+    Отменяет задачи генерации по книге и удаляет их вместе с файлами.
+    Изменения фиксирует вызывающий код
+    """
+    jobs = (
+        await session.execute(
+            select(TTSJob.job_id, TTSJob.audiobook_id).where(
+                TTSJob.book_id == book_id,
+            ),
+        )
+    ).all()
+    tasks = [_job_tasks[job_id] for job_id, _ in jobs if job_id in _job_tasks]
+    for task in tasks:
+        task.cancel()
+
+    # Файлы удаляем только после остановки задач, которые в них пишут
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for _, audiobook_id in jobs:
+        if audiobook_id:
+            _remove_job_files(audiobook_id)
+
+    await session.execute(delete(TTSJob).where(TTSJob.book_id == book_id))
+
+
+def _spawn(bot: Bot, job_id: int):
+    task = asyncio.create_task(_run_job(bot, job_id))
+    _job_tasks[job_id] = task
+    task.add_done_callback(lambda _: _job_tasks.pop(job_id, None))
+
+
+async def _run_job(bot: Bot, job_id: int):
+    try:
+        await _process_job(bot, job_id)
+    except asyncio.CancelledError:
+        logger.info(f"Audiobook generation job {job_id} stopped")
+        raise
+    except Exception as e:
+        logger.exception(f"Audiobook generation job {job_id} failed: {e}")
+        await _fail_job(bot, job_id)
+
+
+async def _update_job(job_id: int, **values):
+    session = await create_session()
+    try:
+        await session.execute(
+            update(TTSJob)
+            .where(TTSJob.job_id == job_id)
+            .values(updated_at=datetime.utcnow(), **values),
+        )
+        await session.commit()
+    finally:
+        await session.close()
+
+
+async def _prepare_job(bot: Bot, job_id: int):
+    """
+    Создает аудиокнигу без файла и сообщение о прогрессе при первом
+    запуске задачи. Возвращает задачу, название книги и фрагменты текста
+    или None, если озвучивать нечего
+    """
+    session = await create_session()
+    try:
+        job = await session.get(TTSJob, job_id)
+        if not job:
+            return None
+
+        book = await session.get(Book, job.book_id)
+        text = await get_book_text(job.book_id) if book else ""
+        if len(text) >= TTS_MAX_TEXT_LENGTH:
+            await bot.send_message(job.chat_id, LEXICON["gtts_text_too_long"])
+
+        if not book or not text or len(text) >= TTS_MAX_TEXT_LENGTH:
+            await session.delete(job)
+            await session.commit()
+            return None
+
+        chunks = split_for_tts(text)
+        # В тексте нет слов (например, одни знаки препинания) - озвучивать
+        # нечего, как и в пустом тексте
+        if not chunks:
+            audiobook_id = job.audiobook_id
+            await session.delete(job)
+            if audiobook_id:
+                await session.execute(
+                    delete(Audiobook).where(
+                        Audiobook.audiobook_id == audiobook_id,
+                    ),
+                )
+
+            await session.commit()
+            if audiobook_id:
+                _remove_job_files(audiobook_id)
+
+            return None
+
+        if job.audiobook_id is None:
+            audiobook = Audiobook(
+                book_id=book.book_id,
+                title=LEXICON["generated_audiobook_title"].format(
+                    book_title=book.title,
+                ),
+                uploader_id=job.user_id,
+            )
+            session.add(audiobook)
+            await session.flush()
+            job.audiobook_id = audiobook.audiobook_id
+
+        if job.progress_message_id is None:
+            message = await bot.send_message(
+                job.chat_id,
+                LEXICON["gtts_start_generating"].format(book_title=book.title),
+            )
+            job.progress_message_id = message.message_id
+
+        # Текст разбит иначе, чем при прошлом запуске (например, после
+        # обновления бота) - контрольная точка не подходит
+        if job.total_chunks != len(chunks):
+            job.completed_chunks = 0
+            job.output_size = 0
+
+        job.status = "running"
+        job.total_chunks = len(chunks)
+        job.updated_at = datetime.utcnow()
+        await session.commit()
+        return job, book.title, chunks
+    finally:
+        await session.close()
+
+
+async def _process_job(bot: Bot, job_id: int):
+    prepared = await _prepare_job(bot, job_id)
+    if prepared is None:
+        return
+
+    job, book_title, chunks = prepared
+    audiobook_id = job.audiobook_id
+    completed = job.completed_chunks
+    output_path = _output_path(audiobook_id)
+    AUDIOBOOKS_DIR.mkdir(parents=True, exist_ok=True)
+    if not output_path.exists():
+        completed = 0
+
+    last_percent = completed * 100 // len(chunks)
+    last_checkpoint = completed
+    last_checkpoint_at = time.monotonic()
+
+    main_file = await aiofiles.open(output_path, "r+b" if completed else "wb")
+    try:
+        # Отбрасываем то, что успели дописать после контрольной точки
+        output_size = job.output_size if completed else 0
+        await main_file.truncate(output_size)
+        await main_file.seek(output_size)
+
+        async def checkpoint(written: int):
+            nonlocal last_percent, last_checkpoint, last_checkpoint_at
+            done = completed + written
+            # Контрольные точки сохраняем пачками, а не после каждого
+            # фрагмента, чтобы не делать транзакцию на каждые 100 символов
+            if (
+                done - last_checkpoint >= CHECKPOINT_CHUNKS
+                or time.monotonic() - last_checkpoint_at >= CHECKPOINT_INTERVAL
+            ):
+                await main_file.flush()
+                await _update_job(
+                    job_id,
+                    completed_chunks=done,
+                    output_size=await main_file.tell(),
+                )
+                last_checkpoint = done
+                last_checkpoint_at = time.monotonic()
+
+            percent = done * 100 // len(chunks)
+            if percent - last_percent >= PROGRESS_STEP and done < len(chunks):
+                last_percent = percent
+                await _report_progress(bot, job, book_title, percent)
+
+        success = await synthesize_to_file(
+            chunks[slice(completed, None)],
+            main_file,
+            lambda index: _temp_path(audiobook_id, completed + index),
+            config.tts.concurrency,
+            TTS_DELAY,
+            TTS_MAX_RETRIES,
+            on_chunk_written=checkpoint,
+        )
+    finally:
+        await main_file.close()
+
+    if success:
+        await _finish_job(bot, job_id, book_title)
+    else:
+        await _fail_job(bot, job_id)
+
+
+async def _report_progress(bot: Bot, job: TTSJob, book_title: str, percent):
+    try:
+        await bot.edit_message_text(
+            LEXICON["gtts_start_generating"].format(book_title=book_title)
+            + "\n"
+            + LEXICON["gtts_progress"].format(percent=percent),
+            chat_id=job.chat_id,
+            message_id=job.progress_message_id,
+        )
+    except TelegramAPIError as e:
+        logger.warning(f"Failed to report audiobook progress: {e}")
+
+
+async def _finish_job(bot: Bot, job_id: int, book_title: str):
+    session = await create_session()
+    try:
+        job = await session.get(TTSJob, job_id)
+        # Задачу удалили вместе с книгой
+        if not job:
+            return
+
+        chat_id = job.chat_id
+        await session.execute(
+            update(Audiobook)
+            .where(Audiobook.audiobook_id == job.audiobook_id)
+            .values(audio_url=str(_output_path(job.audiobook_id))),
+        )
+        await session.delete(job)
+        await session.commit()
+    finally:
+        await session.close()
+
+    await bot.send_message(
+        chat_id,
+        LEXICON["audiobook_generated"].format(book_title=book_title),
+    )
+
+
+async def _fail_job(bot: Bot, job_id: int):
+    session = await create_session()
+    try:
+        job = await session.get(TTSJob, job_id)
+        if not job:
+            return
+
+        chat_id, audiobook_id = job.chat_id, job.audiobook_id
+        await session.execute(delete(TTSJob).where(TTSJob.job_id == job_id))
+        if audiobook_id:
+            await session.execute(
+                delete(Audiobook).where(
+                    Audiobook.audiobook_id == audiobook_id,
+                ),
+            )
+
+        await session.commit()
+    finally:
+        await session.close()
+
+    if audiobook_id:
+        _remove_job_files(audiobook_id)
+
+    try:
+        await bot.send_message(chat_id, LEXICON["gtts_api_failure"])
+    except Exception:
+        logger.exception("Failed to send error notification to user")
@@ -8,6 +8,7 @@ class FSMSearchBook(StatesGroup):
     search_by_title = State()
     search_by_author = State()
     search_by_description = State()
+    search_by_content = State()
     search_by_genre = State()
     search_all = State()
     search_user_books = State()
@@ -0,0 +1,8 @@
+__all__ = ()
+
+import os
+
+# Конфигурация читается при импорте модулей бота,
+# поэтому обязательные переменные задаем до импорта
+os.environ.setdefault("BOT_TOKEN", "test")
+os.environ.setdefault("ADMIN_IDS", "1")
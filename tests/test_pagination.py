@@ -0,0 +1,108 @@
+__all__ = ()
+
+from pathlib import Path
+import random
+
+import pytest
+
+from services.file_handling import PAGE_SIZE, split_book_pages
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+# Отрывки из книг в общественном достоянии: настоящие абзацы,
+# диалоги и переносы строк
+BOOK_FIXTURES = ["kapitanskaya_dochka.txt", "alice_in_wonderland.txt"]
+
+
+# Исходная реализация разбивки на страницы (до paginate_text),
+# с которой сверяются границы страниц
+def _check_for_ellipsis(text: str, start: int, size: int):
+    punctuation_marks = [",", ".", "!", ":", ";", "?"]
+    stop = start + size
+    punctuation_stop = stop + 1
+    if (
+        text[start:stop][-1] in punctuation_marks
+        and text[start:punctuation_stop][-1] in punctuation_marks
+    ):
+        return False
+
+    return True
+
+
+def _get_part_text(text: str, start: int, size: int) -> tuple[str, int]:
+    text += " "
+    punctuation_marks = [",", ".", "!", ":", ";", "?"]
+    while not _check_for_ellipsis(text, start, size):
+        size -= 1
+
+    stop = start + size
+    part_text = text[start:stop] + " "
+    for i in range(1, len(part_text)):
+        if part_text[-i] in punctuation_marks:
+            stop = -i + 1
+            return part_text[:stop], len(part_text[:stop])
+
+    return "", 0
+
+
+def _reference_pages(text: str) -> list[str]:
+    pages = []
+    start = 0
+    while start < len(text):
+        page_text, part_size = _get_part_text(text, start, PAGE_SIZE)
+        if not page_text:
+            break
+
+        pages.append(page_text.strip())
+        start += part_size
+
+    return pages
+
+
+def _random_text(seed: int, length: int) -> str:
+    rng = random.Random(seed)
+    alphabet = "абвгдежзиклмнопрстуфхцчшщыэюя" * 3 + "     \n" + ",.!:;?"
+    parts = []
+    for _ in range(length):
+        if rng.random() < 0.05:
+            # Многоточия и другие последовательности знаков препинания
+            parts.append(rng.choice(("...", "?!", "!..", ",", "…", ".\n")))
+        else:
+            parts.append(rng.choice(alphabet))
+
+    return "".join(parts)
+
+
+SENTENCE = "Мама мыла раму, а папа читал газету. Что дальше? Не знаю... "
+
+SAMPLE_TEXTS = [
+    "",
+    "Текст без знаков препинания",
+    "Одно предложение.",
+    SENTENCE * 100,
+    "слово " * 500 + "конец.",
+    "Многоточие на границе" + "." * 2000 + " и продолжение.",
+    "а" * (PAGE_SIZE - 1) + "...б" + SENTENCE * 30,
+    "а" * (PAGE_SIZE - 2) + "?!" + "б" * 10 + ".",
+    ("строка, " * 200 + "\n") * 10,
+]
+
+
+@pytest.mark.parametrize("text", SAMPLE_TEXTS)
+def test_split_book_pages_matches_reference(text):
+    assert split_book_pages(text) == _reference_pages(text)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_split_book_pages_matches_reference_on_random_text(seed):
+    text = _random_text(seed, PAGE_SIZE * 8)
+    assert split_book_pages(text) == _reference_pages(text)
+
+
+@pytest.mark.parametrize("name", BOOK_FIXTURES)
+@pytest.mark.parametrize("copies", [1, 5])
+def test_split_book_pages_matches_reference_on_books(name, copies):
+    text = (FIXTURES_DIR / name).read_text(encoding="utf-8") * copies
+    pages = split_book_pages(text)
+    assert len(pages) > 1
+    assert pages == _reference_pages(text)